@@ -0,0 +1,96 @@
+"""
+Benchmark of GeneralGraph.betweenness_centrality (Brandes' algorithm)
+against the former implementation, which scanned the list of all the
+shortest paths in the graph for every node.
+
+Usage:
+
+    python benchmarks/betweenness_centrality.py [n_nodes ...]
+"""
+
+import sys
+import time
+import numpy as np
+import networkx as nx
+from grape.general_graph import GeneralGraph
+
+
+def legacy_betweenness_centrality(graph):
+    """
+
+    Betweenness centrality computed from the shortest paths stored in the
+    nodes' "shortest_path" attribute, as done before Brandes' algorithm.
+
+    :param GeneralGraph graph: graph with shortest paths already computed
+
+    :return: betweenness centrality of each node
+    :rtype: dict
+    """
+
+    tot_shortest_paths_list = []
+    for node in graph:
+        for value in graph.nodes[node]["shortest_path"].values():
+            if len(value) > 1:
+                tot_shortest_paths_list.append(value)
+
+    betweenness = {}
+    for node in graph:
+        sp_with_node = [
+            l for l in tot_shortest_paths_list
+            if node in l and node != l[0] and node != l[-1]
+        ]
+        betweenness[node] = len(sp_with_node) / len(tot_shortest_paths_list)
+
+    return betweenness
+
+
+def random_plant(n_nodes, seed=0):
+    """
+
+    Random plant-like graph: a random tree rooted in node '0' (every node
+    is fed by a father), plus some redundant connections.
+
+    :param int n_nodes: number of nodes
+    :param int seed: seed of the random number generator
+
+    :return: the random graph
+    :rtype: GeneralGraph
+    """
+
+    rng = np.random.RandomState(seed)
+    graph = GeneralGraph()
+    graph.add_node('0')
+    for i in range(1, n_nodes):
+        graph.add_edge(str(rng.randint(i)), str(i), weight=1.)
+    for _ in range(n_nodes // 5):
+        u, v = rng.randint(n_nodes, size=2)
+        if u != v:
+            graph.add_edge(str(u), str(v), weight=float(rng.randint(1, 4)))
+
+    return graph
+
+
+if __name__ == '__main__':
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 200, 400]
+
+    print("{:>8} {:>12} {:>12} {:>10}".format(
+        "nodes", "legacy [s]", "brandes [s]", "speedup"))
+
+    for n_nodes in sizes:
+        g = random_plant(n_nodes)
+        g.single_source_shortest_path_serial()
+
+        start = time.time()
+        legacy = legacy_betweenness_centrality(g)
+        legacy_time = time.time() - start
+
+        start = time.time()
+        g.betweenness_centrality()
+        brandes_time = time.time() - start
+
+        brandes = nx.get_node_attributes(g, "betweenness_centrality")
+        assert all(np.isclose(legacy[n], brandes[n]) for n in g)
+
+        print("{:>8} {:>12.4f} {:>12.4f} {:>10.1f}".format(
+            n_nodes, legacy_time, brandes_time, legacy_time / brandes_time))
@@ -0,0 +1,137 @@
+"""
+Benchmark of GeneralGraph.rm_nodes (iterative propagation with set
+membership) and GeneralGraph.propagate_perturbation (vectorized, frontier
+by frontier) against the former recursive implementation, which scanned
+the list of broken nodes for every predecessor, on chains and trees.
+
+Usage:
+
+    python benchmarks/rm_nodes.py [n_nodes ...]
+"""
+
+import sys
+import time
+import logging
+from itertools import chain
+import numpy as np
+from grape.general_graph import GeneralGraph
+
+
+def legacy_rm_nodes(graph, node, visited=None):
+    """
+
+    Recursive propagation of the perturbation, as done before the explicit
+    stack and the set of broken nodes.
+
+    :param GeneralGraph graph: graph in which to propagate the perturbation
+    :param str node: the id of the node to remove
+    :param visited: list of nodes already visited
+    :type visited: set, optional
+    """
+
+    if visited is None:
+        visited = set()
+    visited.add(node)
+    logging.debug('visited: %s', visited)
+    logging.debug('node: %s', node)
+
+    if graph.D[node] in graph.valv:
+        if graph.status[node] == "1":
+            graph.newstatus.update({node: "0"})
+        if len(visited) == 1:
+            graph.broken.append((node, "NULL"))
+        else:
+            return visited
+    else:
+        pred = list(graph.predecessors(node))
+        cond = set()
+        count = 0
+        if pred:
+            for p in pred:
+                cond.add(graph.condition[(p, node)])
+                if any(p in x for x in graph.broken):
+                    count = count + 1
+        else:
+            cond.add("SINGLE")
+
+        if list(cond)[0] != "OR":
+            graph.broken.append((node, "NULL"))
+            logging.debug("broken2: %s", graph.broken)
+        elif len(visited) == 1 or (len(pred) - count) == 0:
+            graph.broken.append((node, "NULL"))
+        else:
+            return 0
+
+    for next in set(graph[node]) - visited:
+        legacy_rm_nodes(graph, next, visited)
+
+    return visited
+
+
+def plant(fathers):
+    """
+
+    Plant-like graph in which every node but '0' is fed by its father,
+    with AND conditions and no valves.
+
+    :param list fathers: father of every node but '0'
+
+    :return: the graph
+    :rtype: GeneralGraph
+    """
+
+    graph = GeneralGraph()
+    graph.add_node('0')
+    graph.add_edges_from((str(f), str(i + 1)) for i, f in enumerate(fathers))
+    graph.D = dict.fromkeys(graph, "pipe")
+    graph.status = dict.fromkeys(graph, "1")
+    graph.condition = dict.fromkeys(graph.edges, "AND")
+    graph.valv = {}
+    graph.newstatus = {}
+
+    return graph
+
+
+if __name__ == '__main__':
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 5000, 100000]
+    # the legacy implementation is quadratic, and recursive
+    legacy_max_nodes = 5000
+    sys.setrecursionlimit(2 * legacy_max_nodes + 1000)
+
+    print("{:>6} {:>8} {:>12} {:>12} {:>12} {:>10}".format(
+        "graph", "nodes", "legacy [s]", "stack [s]", "frontier [s]",
+        "speedup"))
+
+    for n_nodes in sizes:
+        rng = np.random.RandomState(0)
+        graphs = {
+            "chain": plant(range(n_nodes - 1)),
+            "tree": plant(rng.randint(np.arange(1, n_nodes))),
+        }
+
+        for name, g in graphs.items():
+            g.broken = set()
+            start = time.time()
+            g.rm_nodes('0')
+            stack_time = time.time() - start
+            assert len(g.broken) == n_nodes
+
+            g.broken = set()
+            start = time.time()
+            g.propagate_perturbation(['0'])
+            frontier_time = time.time() - start
+            assert len(g.broken) == n_nodes
+
+            if n_nodes <= legacy_max_nodes:
+                g.broken = []
+                start = time.time()
+                legacy_rm_nodes(g, '0')
+                legacy_time = time.time() - start
+                assert len(set(chain(*g.broken)) - {"NULL"}) == n_nodes
+                print("{:>6} {:>8} {:>12.4f} {:>12.4f} {:>12.4f} {:>10.1f}".format(
+                    name, n_nodes, legacy_time, stack_time, frontier_time,
+                    legacy_time / min(stack_time, frontier_time)))
+            else:
+                print("{:>6} {:>8} {:>12} {:>12.4f} {:>12.4f} {:>10}".format(
+                    name, n_nodes, "-", stack_time, frontier_time, "-"))
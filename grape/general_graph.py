@@ -4,13 +4,21 @@ from multiprocessing import Queue
 import multiprocessing as mp
 from multiprocessing.sharedctypes import RawArray
 import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.stats import norm
 import sys
 import csv
+import time
 import ctypes
 import logging
 import warnings
-from itertools import chain
+from itertools import chain, count
+from collections import Counter
+from heapq import heappush, heappop, heappushpop
+from bisect import bisect_right
 import copy
+import inspect
 import networkx as nx
 
 warnings.simplefilter(action='ignore', category=FutureWarning)
@@ -29,6 +37,49 @@ class GeneralGraph(nx.DiGraph):
     attributes.
     """
 
+    # If True, all-pairs shortest path results are never stored: the SSSP
+    # from every source is folded into the efficiency, closeness and service
+    # paths accumulators, and then discarded
+    streaming = False
+
+    # If True, perturbations are propagated by propagate_perturbation,
+    # frontier by frontier with array operations, instead of by the depth
+    # first search of rm_nodes
+    vectorized_cascade = False
+
+    # Policy for the simple paths between SOURCE and USER nodes, whose number
+    # may grow exponentially: "all" reports them, "count" reports their
+    # number without keeping them and "none" skips them. The enumeration
+    # stops after max_simple_paths paths or simple_paths_time_budget seconds,
+    # and skips paths longer than simple_paths_cutoff edges. Reported paths
+    # are kept in memory until they are written to file, so by default at
+    # most max_simple_paths of them are kept for each pair (None lifts the
+    # bound)
+    simple_paths_policy = "all"
+    max_simple_paths = 1000
+    simple_paths_cutoff = None
+    simple_paths_time_budget = None
+
+    # Metrics that can be requested to compute_metrics, together with the
+    # metrics they depend on
+    metrics_dependencies = {
+        "calculate_shortest_path": (),
+        "nodal_efficiency": ("calculate_shortest_path",),
+        "global_efficiency": ("nodal_efficiency",),
+        "local_efficiency": ("nodal_efficiency",),
+        "closeness_centrality": ("calculate_shortest_path",),
+        "betweenness_centrality": (),
+        "degree_centralities": (),
+        "degree_centrality": (),
+        "indegree_centrality": (),
+        "outdegree_centrality": (),
+        "closure_index": (),
+    }
+
+    # Metrics evaluated both before and after a perturbation
+    efficiency_metrics = ("nodal_efficiency", "global_efficiency",
+        "local_efficiency")
+
     def load(self, filename):
         """
 
@@ -96,6 +147,152 @@ class GeneralGraph(nx.DiGraph):
 			"isolation_B" : { "0": "CLOSED", "1": "OPEN"},
 			"unknown" : { "0": "OFF", "1": "ON"} }
 
+    def invalidate_metrics(self):
+        """
+
+        Forget the metrics computed so far, so that they are computed again
+        the next time they are requested, and the description of the graph
+        (see check_before).
+        """
+
+        self.computed_metrics = set()
+        self.described = False
+
+    def structural_copy(self):
+        """
+
+        Structural copy of the graph, to be kept as the intact graph while
+        the graph itself is perturbed. Nodes, edges and their attribute
+        dictionaries are copied, while the attribute values are shared with
+        the graph, so the copy costs as much as the number of nodes and
+        edges (it is not an overlay on the graph), and not as the shortest
+        paths stored in the nodes.
+
+        :return: the copy of the graph
+        :rtype: GeneralGraph
+
+        .. note:: The shared values are never modified in place: the
+            graph replaces them when it needs to change them.
+            Graph attributes are shallow copies, while numpy arrays
+            are shared as well.
+        """
+
+        graph = self.__class__()
+        graph.add_nodes_from((n, dict(data)) for n, data in self.nodes.items())
+        graph.add_edges_from((u, v, dict(data))
+            for u, v, data in self.edges(data=True))
+        graph.graph.update(self.graph)
+
+        for key, value in self.__dict__.items():
+            # skip the internals and the cached views of networkx
+            if key not in graph.__dict__ and not hasattr(nx.DiGraph, key):
+                graph.__dict__[key] = (value.copy()
+                    if isinstance(value, (dict, set, list)) else value)
+
+        # metrics computed so far still describe the copy
+        graph.computed_metrics = set(getattr(self, "computed_metrics", ()))
+        removals = getattr(self, "apsp_removals", None)
+        if removals is not None:
+            graph.apsp_removals = (set(removals[0]), set(removals[1]))
+
+        return graph
+
+    def simulate_perturbation(self, perturbation, *args, **kwargs):
+        """
+
+        Simulate a perturbation on a copy of the graph, leaving the graph
+        intact, so that any number of perturbations can be evaluated
+        against it. The intact graph is described (see check_before) only
+        the first time, and each perturbation pays only for its propagation
+        and for the description of the perturbed graph.
+
+        :param str perturbation: name of the method simulating the
+            perturbation, i.e. "delete_a_node", "delete_an_edge",
+            "delete_edges" or "simulate_multi_area_perturbation"
+        :param args: positional arguments of the perturbation
+        :param kwargs: keyword arguments of the perturbation
+
+        :return: the perturbed copy of the graph, whose copy_of_self1
+            describes the intact graph together with the effects of the
+            perturbation
+        :rtype: GeneralGraph
+        """
+
+        arguments = inspect.signature(getattr(self, perturbation)).bind(
+            *args, **kwargs)
+        arguments.apply_defaults()
+        self.check_before(arguments.arguments["metrics"])
+
+        graph = self.structural_copy()
+        getattr(graph, perturbation)(*args, **kwargs)
+
+        return graph
+
+    def track_removals(self, nodes=(), edges=()):
+        """
+
+        Keep track of the nodes and edges removed since the all-pairs
+        shortest paths were last computed, so that they can be updated
+        decrementally (see decremental_shortest_path). Any other change
+        in the graph nodes or edges requires a computation from scratch.
+
+        :param nodes: removed nodes
+        :type nodes: iterable, optional
+        :param edges: removed edges
+        :type edges: iterable, optional
+        """
+
+        if getattr(self, "apsp_removals", None) is not None:
+            self.apsp_removals[0].update(nodes)
+            self.apsp_removals[1].update(edges)
+
+    def add_node(self, node_for_adding, **attr):
+        super().add_node(node_for_adding, **attr)
+        self.invalidate_metrics()
+        self.apsp_removals = None
+
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        super().add_nodes_from(nodes_for_adding, **attr)
+        self.invalidate_metrics()
+        self.apsp_removals = None
+
+    def remove_node(self, n):
+        super().remove_node(n)
+        self.invalidate_metrics()
+        self.track_removals(nodes=[n])
+
+    def remove_nodes_from(self, nodes):
+        nodes = list(nodes)
+        super().remove_nodes_from(nodes)
+        self.invalidate_metrics()
+        self.track_removals(nodes=nodes)
+
+    def add_edge(self, u_of_edge, v_of_edge, **attr):
+        super().add_edge(u_of_edge, v_of_edge, **attr)
+        self.invalidate_metrics()
+        self.apsp_removals = None
+
+    def add_edges_from(self, ebunch_to_add, **attr):
+        super().add_edges_from(ebunch_to_add, **attr)
+        self.invalidate_metrics()
+        self.apsp_removals = None
+
+    def remove_edge(self, u, v):
+        super().remove_edge(u, v)
+        self.invalidate_metrics()
+        self.track_removals(edges=[(u, v)])
+
+    def remove_edges_from(self, ebunch):
+        ebunch = list(ebunch)
+        super().remove_edges_from(ebunch)
+        self.invalidate_metrics()
+        self.track_removals(edges=[tuple(e[:2]) for e in ebunch])
+
+    def clear(self):
+        super().clear()
+        self.invalidate_metrics()
+        self.apsp_removals = None
+
     def check_input_with_gephi(self):
         """
 
@@ -245,52 +442,147 @@ class GeneralGraph(nx.DiGraph):
         paths = self.construct_path_kernel(pred, nodi)
         record.update(paths) 
 
-    def compute_efficiency_kernel(self, nodi):
+    @staticmethod
+    def compute_efficiency(dist):
         """
 
-        Compute efficiency, starting from path length attribute.
+        Compute efficiency, starting from a block of rows of the
+        distance matrix.
         Efficiency is a measure of how good is the exchange of commodities
         flowing from one node to the others.
 
+        :param numpy.ndarray dist: matrix (or block of rows) of distances
+
+        :return: matrix of efficiencies, with the same shape of dist.
+            The efficiency is the reciprocal of the distance, and it is
+            equal to zero both for unreachable targets (infinite distance)
+            and for the source itself (null distance)
+        :rtype: numpy.ndarray
+        """
+
+        eff = np.zeros(dist.shape)
+        np.divide(1., dist, out=eff, where=(dist != 0))
+
+        return eff
+
+    def compute_efficiency_kernel(self, nodi):
+        """
+
+        Materialize the efficiency, starting from the distance matrix.
+        In streaming mode, where the distance matrix is not stored, the
+        distances from the nodes are computed again, a block of sources
+        at a time, with the Dijkstra algorithm.
+
         :param list nodi: list of nodes for which to compute the
             efficiency between them and all the other nodes
 
         :return: nested dictionary with key corresponding to
             source, while as value a dictionary keyed by target and valued
-            by the source-target efficiency
+            by the source-target efficiency (only reachable targets are
+            included)
         :rtype: dict
         """
 
         dict_efficiency = {}
+        if self.streaming:
+            csr = self.csr_initialization()
+        nodes = np.asarray([self.ids[i] for i in range(len(self.ids))],
+            dtype=object)
+
+        for start in range(0, len(nodi), 256):
+            block = [self.ids_reversed[n] for n in nodi[start:start + 256]]
+            if self.streaming:
+                dist = dijkstra(csr, directed=True, indices=block)
+            else:
+                dist = self.dist[block]
 
-        for n in nodi:
-            dict_efficiency[n] = {}
-            for key, length_path in self.nodes[n]["shpath_length"].items():
-                if length_path != 0 : 
-                    efficiency = 1 / length_path
-                    dict_efficiency[n].update({key: efficiency})
-                else:
-                    efficiency = 0
-                    dict_efficiency[n].update({key: efficiency})
+            for n, row in zip(nodi[start:start + 256], dist):
+                reachable = np.isfinite(row)
+                dict_efficiency[n] = dict(zip(nodes[reachable],
+                    self.compute_efficiency(row[reachable]).tolist()))
 
         return dict_efficiency
 
-    def compute_efficiency_iteration_parallel(self, nodi, record):
+    def materialize_efficiency(self):
         """
 
-        Inner iteration for parallel efficiency calculation,
-        to update shared dictionary.
+        Nodes' "efficiency" attribute is evaluated, that is the nested
+        dictionary of source-target efficiencies.
 
-        :param list nodi: nodes for which to compute the
-            shortest path between them and all the other nodes
-        :param multiprocessing.managers.dict record: nested dictionary
-            with key corresponding to source, while as value a
-            dictionary keyed by target and valued by the
-            source-target efficiency
+        .. note:: Efficiency measures are computed directly from the distance
+            matrix, so this dictionary is not needed by any of them. It is
+            populated only on demand, since it costs as much memory as the
+            distance matrix itself.
+            In streaming mode the distances are computed again
+            (see compute_efficiency_kernel).
+        """
+
+        eff_dicts = self.compute_efficiency_kernel(list(self))
+        nx.set_node_attributes(self, eff_dicts, name="efficiency")
+
+    def shpath_length_to_matrix(self):
         """
 
-        dict_efficiency = self.compute_efficiency_kernel(nodi)
-        record.update(dict_efficiency) 
+        Build the distance and predecessors matrices starting from the
+        nested dictionaries of the length of the paths and of the
+        shortest paths.
+        The conversion between the labels (ids) in the graph and Numpy
+        matrix indices (and viceversa) is also exploited.
+        """
+
+        self.ids = dict(enumerate(self))
+        self.ids_reversed = { value: key for key, value in self.ids.items() }
+
+        self.dist = np.full((len(self), len(self)), np.inf)
+        self.shpath_pred = np.full((len(self), len(self)), -1, dtype=np.int32)
+        for n in self:
+            self.shpath_to_matrix_row(n)
+
+    def shpath_to_matrix_row(self, n):
+        """
+
+        Fill the row of the distance and predecessors matrices of a node,
+        starting from its dictionaries of the length of the paths and of
+        the shortest paths.
+
+        :param n: the node
+        """
+
+        lengths = self.nodes[n]["shpath_length"]
+        targets = list(map(self.ids_reversed.get, lengths.keys()))
+        self.dist[self.ids_reversed[n]] = np.inf
+        self.dist[self.ids_reversed[n], targets] = list(lengths.values())
+
+        paths = [path for path in self.nodes[n]["shortest_path"].values()
+            if len(path) > 1]
+        self.shpath_pred[self.ids_reversed[n]] = -1
+        self.shpath_pred[self.ids_reversed[n],
+            [self.ids_reversed[path[-1]] for path in paths]] = [
+            self.ids_reversed[path[-2]] for path in paths]
+
+    def csr_initialization(self):
+        """
+
+        Initialization of the CSR (Compressed Sparse Row) representation
+        of the graph, that is the weighted adjacency matrix in sparse format.
+        The conversion between the labels (ids) in the graph and the
+        matrix indices (and viceversa) is also exploited.
+
+        :return: weighted adjacency matrix, with the outgoing edges of the
+            i-th node stored in the i-th row
+        :rtype: scipy.sparse.csr_matrix
+        """
+
+        self.ids = dict(enumerate(self))
+        self.ids_reversed = { value: key for key, value in self.ids.items() }
+
+        edges = list(self.edges(data='weight'))
+        rows = [self.ids_reversed[u] for u, v, w in edges]
+        cols = [self.ids_reversed[v] for u, v, w in edges]
+        weights = [w for u, v, w in edges]
+
+        return csr_matrix((weights, (rows, cols)),
+            shape=(len(self), len(self)), dtype=float)
 
     def floyd_warshall_initialization(self):
         """
@@ -311,7 +603,7 @@ class GeneralGraph(nx.DiGraph):
         self.ids = nx.get_node_attributes(self.H, 'Mark_ids')
         self.ids_reversed = { value: key for key, value in self.ids.items() }
 
-        dist = nx.to_numpy_matrix(self.H, nodelist=sorted(list(self.H)))
+        dist = nx.to_numpy_array(self.H, nodelist=sorted(list(self.H)))
         dist[dist == 0] = np.inf
         np.fill_diagonal(dist, 0.)
 
@@ -355,8 +647,7 @@ class GeneralGraph(nx.DiGraph):
 
         Parallel Floyd Warshall's APSP algorithm. The predecessors
         and distance matrices are evaluated, together with the nested
-        dictionaries for shortest-path, length of the paths and
-        efficiency attributes.
+        dictionaries for shortest-path and length of the paths attributes.
 
         .. note:: Edges weight is taken into account in the distance matrix.
             Edge weight attributes must be numerical. Distances are calculated
@@ -421,28 +712,15 @@ class GeneralGraph(nx.DiGraph):
                 length_path = arr[self.ids_reversed[value[0]], self.ids_reversed[value[-1]]]
                 self.nodes[self.ids[i]]["shpath_length"][key] =  length_path
 
-        eff_dicts = manager.dict()
-        
-        processes = [
-            mp.Process( target=self.compute_efficiency_iteration_parallel,
-            args=(node_chunks[p], eff_dicts) )
-            for p in range(self.num) ]
-
-        for proc in processes:
-            proc.start()
-
-        for proc in processes:
-            proc.join()
-
-        nx.set_node_attributes(self, eff_dicts, name="efficiency")
+        self.dist = np.array(arr)
+        self.shpath_pred = np.where(np.isinf(arr1), -1, arr1).astype(np.int32)
 
     def floyd_warshall_predecessor_and_distance_serial(self):
         """
 
         Serial Floyd Warshall's APSP algorithm. The predecessors
         and distance matrices are evaluated, together with the nested
-        dictionaries for shortest-path, length of the paths and
-        efficiency attributes.
+        dictionaries for shortest-path and length of the paths attributes.
 
         .. note:: Edges weight is taken into account in the distance matrix.
             Edge weight attributes must be numerical. Distances are calculated
@@ -469,15 +747,15 @@ class GeneralGraph(nx.DiGraph):
                 length_path = dist[self.ids_reversed[value[0]], self.ids_reversed[value[-1]]]
                 self.nodes[self.ids[i]]["shpath_length"][key] =  length_path
 
-        eff_dicts = self.compute_efficiency_kernel(list(self))
-        nx.set_node_attributes(self, eff_dicts, name="efficiency")
+        self.dist = dist
+        self.shpath_pred = np.where(np.isinf(pred), -1, pred).astype(np.int32)
 
     def single_source_shortest_path_serial(self):
         """
 
         Serial SSSP algorithm based on Dijkstra’s method.
-        The nested dictionaries for shortest-path, length of the paths and
-        efficiency attributes are evaluated.
+        The nested dictionaries for shortest-path and length of the paths
+        attributes are evaluated, together with the distance matrix.
 
         .. note:: Edges weight is taken into account. Edge weight attributes must
             be numerical. Distances are calculated as sums of weighted edges traversed.
@@ -487,9 +765,8 @@ class GeneralGraph(nx.DiGraph):
             sssps = (n, nx.single_source_dijkstra(self, n, weight = 'weight'))
             self.nodes[n]["shortest_path"] = sssps[1][1]
             self.nodes[n]["shpath_length"] = sssps[1][0]
-            
-        eff_dicts = self.compute_efficiency_kernel(list(self))
-        nx.set_node_attributes(self, eff_dicts, name="efficiency")
+
+        self.shpath_length_to_matrix()
 
     def single_source_shortest_path_parallel(self, out_q, nodi):
         """
@@ -534,8 +811,8 @@ class GeneralGraph(nx.DiGraph):
         """
 
         Wrapper for parallel SSSP algorithm based on Dijkstra’s method.
-        The nested dictionaries for shortest-path, length of the paths and
-        efficiency attributes are evaluated.
+        The nested dictionaries for shortest-path and length of the paths
+        attributes are evaluated, together with the distance matrix.
 
         .. note:: Edges weight is taken into account. Edge weight attributes must
             be numerical. Distances are calculated as sums of weighted edges traversed.
@@ -570,21 +847,145 @@ class GeneralGraph(nx.DiGraph):
             self.nodes[n]["shortest_path"] = ssspp[1][1]
             self.nodes[n]["shpath_length"] = ssspp[1][0]
 
-        manager = mp.Manager()
-        eff_dicts = manager.dict()
-        
-        processes = [
-            mp.Process( target=self.compute_efficiency_iteration_parallel,
-            args=(node_chunks[p], eff_dicts) )
-            for p in range(self.num) ]
+        self.shpath_length_to_matrix()
 
-        for proc in processes:
-            proc.start()
+    @staticmethod
+    def streaming_kernel(csr, sources, service_pairs):
+        """
 
-        for proc in processes:
-            proc.join()
+        Streaming inner iteration: the SSSP from every source is folded into
+        the accumulators of the efficiency, the closeness and the service
+        paths, and then discarded.
 
-        nx.set_node_attributes(self, eff_dicts, name="efficiency")
+        :param scipy.sparse.csr_matrix csr: weighted adjacency matrix
+        :param list sources: list of indices of the source nodes
+        :param dict service_pairs: dictionary keyed by the indices of the
+            SOURCE nodes and valued by the list of the indices of the USER
+            nodes
+
+        :return: the sum of the efficiencies from every source (zero for
+            the other nodes), the column reductions needed by closeness
+            centrality, and a dictionary keyed by the SOURCE-USER couples
+            of indices and valued by their shortest path (as list of
+            indices) and its length, for the reachable USER nodes only
+        :rtype: tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray, dict)
+        """
+
+        n = csr.shape[0]
+        sum_efficiencies = np.zeros(n)
+        n_paths = np.zeros(n, dtype=int)
+        sum_lengths = np.zeros(n)
+        service_paths = {}
+
+        for s in sources:
+            dist, pred = dijkstra(csr, indices=s, return_predecessors=True)
+
+            sum_efficiencies[s] = GeneralGraph.compute_efficiency(dist).sum()
+            source_n_paths, source_sum_lengths = \
+                GeneralGraph.closeness_centrality_kernel(dist[None, :], [s])
+            n_paths += source_n_paths
+            sum_lengths += source_sum_lengths
+
+            for t in service_pairs.get(s, []):
+                if np.isfinite(dist[t]):
+                    path = [t]
+                    while path[-1] != s:
+                        path.append(int(pred[path[-1]]))
+                    service_paths[(s, t)] = (path[::-1], dist[t])
+
+        return sum_efficiencies, n_paths, sum_lengths, service_paths
+
+    def streaming_iteration_parallel(self, out_q, csr, sources, service_pairs):
+        """
+
+        Inner iteration for parallel streaming SSSP.
+
+        :param multiprocessing.queues.Queue out_q: multiprocessing queue
+        :param scipy.sparse.csr_matrix csr: weighted adjacency matrix
+        :param list sources: list of indices of the source nodes
+        :param dict service_pairs: dictionary keyed by the indices of the
+            SOURCE nodes and valued by the list of the indices of the USER
+            nodes
+        """
+
+        out_q.put(self.streaming_kernel(csr, sources, service_pairs))
+
+    def streaming_shortest_path(self):
+        """
+
+        Streaming SSSP algorithm based on Dijkstra's method.
+        Only the accumulators needed by efficiency and closeness measures,
+        together with the shortest paths between SOURCE and USER nodes,
+        are evaluated: the nested dictionaries for shortest-path and length
+        of the paths attributes, and the distance matrix, are not.
+        For big graphs go parallel (number of processes equals the total
+        number of available CPUs), for small graphs go serial.
+
+        .. note:: Edges weight is taken into account. Edge weight attributes must
+            be numerical. Distances are calculated as sums of weighted edges traversed.
+            Memory footprint is linear in the number of nodes and edges
+            for each process.
+        """
+
+        csr = self.csr_initialization()
+        sources = list(range(len(self)))
+
+        marks = { value: key for key, value in reversed(list(self.Mark.items())) }
+        users = [self.ids_reversed[marks[jj]] for jj in self.services_USER
+            if marks[jj] in self]
+        service_pairs = { self.ids_reversed[marks[ii]]: users
+            for ii in self.services_SOURCE if marks[ii] in self }
+
+        if len(self) > 10000:
+            out_q = Queue()
+            source_chunks = self.chunk_it(sources, self.num)
+
+            processes = [
+                mp.Process( target=self.streaming_iteration_parallel,
+                args=(out_q, csr, source_chunks[p], service_pairs))
+                for p in range(len(source_chunks)) ]
+
+            for proc in processes:
+                proc.start()
+
+            results = [out_q.get() for proc in processes]
+
+            for proc in processes:
+                proc.join()
+        else:
+            results = [self.streaming_kernel(csr, sources, service_pairs)]
+
+        self.dist = None
+        self.sum_efficiencies = sum(result[0] for result in results)
+        self.closeness_reductions = (sum(result[1] for result in results),
+            sum(result[2] for result in results))
+        self.service_shortest_paths = {
+            (self.ids[s], self.ids[t]): (list(map(self.ids.get, path)), length)
+            for result in results
+            for (s, t), (path, length) in result[3].items()
+        }
+
+    def service_shortest_path(self, source, target):
+        """
+
+        Shortest path between a SOURCE and a USER node.
+
+        :param source: SOURCE node
+        :param target: USER node
+
+        :return: the shortest path and its length, or None if the
+            target cannot be reached from the source
+        :rtype: tuple(list, float)
+        """
+
+        if self.streaming:
+            return self.service_shortest_paths.get((source, target))
+
+        if target in self.nodes[source]["shortest_path"]:
+            return (self.nodes[source]["shortest_path"][target],
+                self.nodes[source]["shpath_length"][target])
+
+        return None
 
     def nodal_efficiency(self):
         """
@@ -601,28 +1002,32 @@ class GeneralGraph(nx.DiGraph):
         .. note:: The global efficiency of the node is equal to zero for a node
             without any outgoing path and equal to one if from it we can reach
             each node of the digraph.
+            It is computed as the row sums of the efficiency matrix,
+            directly from the distance matrix.
         """
         
         g_len = len(list(self))
         first_node = list(self)[0]
         all_attributes = list(self.nodes[first_node].keys())
 
+        if self.streaming:
+            sum_efficiencies = self.sum_efficiencies
+        else:
+            sum_efficiencies = self.compute_efficiency(self.dist).sum(axis=1)
+        nodal_eff = dict(zip(map(self.ids.get, range(g_len)),
+            (sum_efficiencies / (g_len - 1)).tolist()))
+
         if "original_nodal_eff" in all_attributes:
 
             deleted_nodes = set(list(self.copy_of_self1)) - set(list(self))
 
-            for v in deleted_nodes:
-                self.copy_of_self1.nodes[v]["final_nodal_eff"] = " "
-
-            for v in self:
-                sum_efficiencies = sum(self.nodes[v]["efficiency"].values())
-                self.copy_of_self1.nodes[v][
-                    "final_nodal_eff"] = sum_efficiencies / (g_len - 1)
+            nx.set_node_attributes(self.copy_of_self1,
+                dict.fromkeys(deleted_nodes, " "), name="final_nodal_eff")
+            nx.set_node_attributes(self.copy_of_self1, nodal_eff,
+                name="final_nodal_eff")
 
         else:
-            for v in self:
-                sum_efficiencies = sum(self.nodes[v]["efficiency"].values())
-                self.nodes[v]["original_nodal_eff"] = sum_efficiencies / (g_len - 1)
+            nx.set_node_attributes(self, nodal_eff, name="original_nodal_eff")
 
     def local_efficiency(self):
         """
@@ -642,48 +1047,39 @@ class GeneralGraph(nx.DiGraph):
             to the perturbation of node removal, i.e. if we remove a node,
             how efficiently its first-order outgoing neighbors can communicate.
             It is in the range [0, 1].
+            It is computed as the product between the adjacency matrix,
+            normalized by the outdegree of the nodes, and the vector of the
+            nodal efficiencies.
         """
 
         first_node = list(self)[0]
         all_attributes = list(self.nodes[first_node].keys())
 
         if "original_local_eff" in all_attributes:
+            graph, nodal_eff_field, local_eff_field = (self.copy_of_self1,
+                "final_nodal_eff", "final_local_eff")
 
             deleted_nodes = set(list(self.copy_of_self1)) - set(list(self))
+            nx.set_node_attributes(self.copy_of_self1,
+                dict.fromkeys(deleted_nodes, " "), name="final_local_eff")
+        else:
+            graph, nodal_eff_field, local_eff_field = (self,
+                "original_nodal_eff", "original_local_eff")
 
-            for v in deleted_nodes:
-                self.copy_of_self1.nodes[v]["final_local_eff"] = " "
-
-            for v in self:
-                subgraph = list(self.successors(v))
-                denom_subg = len(list(subgraph))
+        adjacency = self.csr_initialization()
+        adjacency.data[:] = 1.
+        nodi = list(map(self.ids.get, range(len(self))))
 
-                if denom_subg != 0:
-                    sum_efficiencies = 0
-                    for w in list(subgraph):
-                        kv_efficiency = self.copy_of_self1.nodes[w][
-                            "final_nodal_eff"]
-                        sum_efficiencies = sum_efficiencies + kv_efficiency
+        nodal_eff = nx.get_node_attributes(graph, nodal_eff_field)
+        nodal_eff = np.asarray([nodal_eff[v] for v in nodi], dtype=float)
 
-                    loc_eff = sum_efficiencies / denom_subg
+        out_degree = np.diff(adjacency.indptr)
+        local_eff = np.zeros(len(nodi))
+        np.divide(adjacency.dot(nodal_eff), out_degree, out=local_eff,
+            where=(out_degree != 0))
 
-                    self.copy_of_self1.nodes[v]["final_local_eff"] = loc_eff
-                else:
-                    self.copy_of_self1.nodes[v]["final_local_eff"] = 0
-        else:
-            for v in self:
-                subgraph = list(self.successors(v))
-                denom_subg = len(list(subgraph))
-                if denom_subg != 0:
-                    sum_efficiencies = 0
-                    for w in list(subgraph):
-                        kv_efficiency = self.nodes[w]["original_nodal_eff"]
-                        sum_efficiencies = sum_efficiencies + kv_efficiency
-
-                    loc_eff = sum_efficiencies / denom_subg
-                    self.nodes[v]["original_local_eff"] = loc_eff
-                else:
-                    self.nodes[v]["original_local_eff"] = 0
+        nx.set_node_attributes(graph, dict(zip(nodi, local_eff.tolist())),
+            name=local_eff_field)
 
     def global_efficiency(self):
         """
@@ -701,27 +1097,222 @@ class GeneralGraph(nx.DiGraph):
             efficiency of all pairs of nodes.
         """
 
-        g_len = len(list(self))
-        sum_eff = 0
         first_node = list(self)[0]
         all_attributes = list(self.nodes[first_node].keys())
 
-        for v in self:
-            kv_efficiency = self.nodes[v]["original_nodal_eff"]
-            sum_eff = sum_eff + kv_efficiency
+        nodal_eff = nx.get_node_attributes(self, "original_nodal_eff")
+        avg_global_eff = float(np.mean(list(nodal_eff.values())))
 
         if "original_avg_global_eff" in all_attributes:
-            for v in self.copy_of_self1:
-                self.copy_of_self1.nodes[v]["final_avg_global_eff"] = sum_eff / g_len
+            nx.set_node_attributes(self.copy_of_self1, avg_global_eff,
+                name="final_avg_global_eff")
         else:
-            for v in self:
-                self.nodes[v]["original_avg_global_eff"] = sum_eff / g_len
+            nx.set_node_attributes(self, avg_global_eff,
+                name="original_avg_global_eff")
+
+    @staticmethod
+    def dependency_kernel(indptr, indices, weights, source,
+        all_shortest_paths=False):
+        """
+
+        Brandes' algorithm single source iteration: weighted SSSP from the
+        source, followed by the accumulation of the dependencies of the nodes
+        in reverse order of distance from the source.
+
+        :param list indptr: CSR index pointers of the adjacency matrix
+        :param list indices: CSR column indices of the adjacency matrix
+        :param list weights: CSR edge weights of the adjacency matrix
+        :param int source: index of the source node
+        :param bool all_shortest_paths: if True, every shortest path
+            between the source and a target is taken into account (each one
+            weighted by the reciprocal of the number of shortest paths);
+            otherwise, a single shortest path is taken into account for each
+            target, namely the one found by Dijkstra's method
+
+        :return: dictionary keyed by the indices of the nodes reachable
+            from the source (source excluded) and valued by the number of
+            source-target shortest paths they lie on (target excluded),
+            and the number of source-target shortest paths
+        :rtype: tuple(dict, int)
+        """
+
+        dist = {source: 0.}
+        sigma = {source: 1.}
+        pred = {source: []}
+        settled = []
+        done = set()
+        c = count()
+        heap = [(0., next(c), source)]
+
+        while heap:
+            d, _, v = heappop(heap)
+            if v in done:
+                continue
+            done.add(v)
+            settled.append(v)
+            for k in range(indptr[v], indptr[v + 1]):
+                w = indices[k]
+                vw_dist = d + weights[k]
+                if w not in dist or vw_dist < dist[w]:
+                    dist[w] = vw_dist
+                    sigma[w] = sigma[v]
+                    pred[w] = [v]
+                    heappush(heap, (vw_dist, next(c), w))
+                elif vw_dist == dist[w] and all_shortest_paths:
+                    sigma[w] += sigma[v]
+                    pred[w].append(v)
+
+        delta = dict.fromkeys(settled, 0.)
+        for w in reversed(settled):
+            for v in pred[w]:
+                delta[v] += sigma[v] / sigma[w] * (1. + delta[w])
+        del delta[source]
+
+        return delta, len(settled) - 1
+
+    @staticmethod
+    def betweenness_centrality_kernel(csr, sources, all_shortest_paths=False,
+        approximate=False):
+        """
+
+        Brandes' algorithm inner iteration over a list of sources.
+
+        :param scipy.sparse.csr_matrix csr: weighted adjacency matrix
+        :param list sources: list of indices of the source nodes
+        :param bool all_shortest_paths: if True, every shortest path
+            between a source and a target is taken into account
+        :param bool approximate: if True, the second order moments needed to
+            estimate the variance of the sampled betweenness are returned too
+
+        :return: the number of source-target shortest paths each node lies
+            on (source and target excluded), and the total number of
+            source-target shortest paths. If approximate, the sums over the
+            sources of the squared dependencies, of the dependencies times
+            the number of shortest paths from the source, and of the squared
+            number of shortest paths from the source follow.
+        :rtype: tuple
+        """
+
+        indptr = csr.indptr.tolist()
+        indices = csr.indices.tolist()
+        weights = csr.data.tolist()
+
+        betweenness = np.zeros(csr.shape[0])
+        betweenness_sq = np.zeros(csr.shape[0])
+        betweenness_paths = np.zeros(csr.shape[0])
+        tot_shortest_paths = 0
+        tot_shortest_paths_sq = 0
+
+        for s in sources:
+            delta, n_shortest_paths = GeneralGraph.dependency_kernel(
+                indptr, indices, weights, s, all_shortest_paths)
+            nodi = list(delta.keys())
+            dependencies = np.fromiter(delta.values(), dtype=float,
+                count=len(delta))
+
+            betweenness[nodi] += dependencies
+            tot_shortest_paths += n_shortest_paths
+
+            if approximate:
+                betweenness_sq[nodi] += dependencies**2
+                betweenness_paths[nodi] += dependencies * n_shortest_paths
+                tot_shortest_paths_sq += n_shortest_paths**2
+
+        if approximate:
+            return (betweenness, tot_shortest_paths, betweenness_sq,
+                betweenness_paths, tot_shortest_paths_sq)
+
+        return betweenness, tot_shortest_paths
+
+    def betweenness_centrality_iteration_parallel(self, out_q, csr, sources,
+        all_shortest_paths, approximate):
+        """
+
+        Inner iteration for parallel betweenness centrality calculation.
+
+        :param multiprocessing.queues.Queue out_q: multiprocessing queue
+        :param scipy.sparse.csr_matrix csr: weighted adjacency matrix
+        :param list sources: list of indices of the source nodes
+        :param bool all_shortest_paths: if True, every shortest path
+            between a source and a target is taken into account
+        :param bool approximate: if True, the second order moments needed to
+            estimate the variance of the sampled betweenness are computed too
+        """
+
+        out_q.put(self.betweenness_centrality_kernel(csr, sources,
+            all_shortest_paths, approximate))
+
+    def betweenness_centrality_sources(self, csr, sources,
+        all_shortest_paths=False, approximate=False):
+        """
+
+        Accumulate Brandes' dependencies over a list of sources.
+        For big graphs go parallel (number of processes equals the total
+        number of available CPUs), for small graphs go serial.
 
-    def betweenness_centrality(self):
+        :param scipy.sparse.csr_matrix csr: weighted adjacency matrix
+        :param list sources: list of indices of the source nodes
+        :param bool all_shortest_paths: if True, every shortest path
+            between a source and a target is taken into account
+        :param bool approximate: if True, the second order moments needed to
+            estimate the variance of the sampled betweenness are computed too
+
+        :return: the output of betweenness_centrality_kernel,
+            summed over all the sources
+        :rtype: tuple
+        """
+
+        if len(self) <= 10000:
+            return self.betweenness_centrality_kernel(csr, sources,
+                all_shortest_paths, approximate)
+
+        num = getattr(self, "num", mp.cpu_count())
+        out_q = Queue()
+        source_chunks = self.chunk_it(sources, num)
+
+        processes = [
+            mp.Process( target=self.betweenness_centrality_iteration_parallel,
+            args=(out_q, csr, source_chunks[p], all_shortest_paths, approximate))
+            for p in range(len(source_chunks)) ]
+
+        for proc in processes:
+            proc.start()
+
+        results = [out_q.get() for proc in processes]
+
+        for proc in processes:
+            proc.join()
+
+        return tuple(sum(moment) for moment in zip(*results))
+
+    def betweenness_centrality(self, all_shortest_paths=False,
+        approximate=False, epsilon=0.01, confidence=0.95, seed=None,
+        top_k=None):
         """
 
         Betweenness_centrality measure of each node.
         Nodes' "betweenness_centrality" attribute is evaluated.
+        In approximate mode, nodes' "betweenness_centrality_ci" attribute,
+        that is the confidence interval of the estimate, is evaluated too.
+
+        :param bool all_shortest_paths: if True, every shortest path
+            between a source and a target is taken into account (each one
+            weighted by the reciprocal of the number of shortest paths);
+            otherwise, a single shortest path is taken into account for each
+            source-target couple. Default to False.
+        :param bool approximate: if True, betweenness centrality is estimated
+            from a random sample of sources, which is enlarged until the
+            confidence intervals are narrow enough. Default to False.
+        :param float epsilon: maximum half-width of the confidence intervals,
+            in approximate mode. Default to 0.01.
+        :param float confidence: confidence level of the intervals,
+            in approximate mode. Default to 0.95.
+        :param int seed: seed of the random sampling of the sources,
+            in approximate mode. Default to None.
+        :param int top_k: if given, in approximate mode sampling also stops
+            as soon as the confidence intervals of the top_k nodes with the
+            highest estimate do not overlap with the ones of the other
+            nodes, so that the top_k ranking is stable. Default to None.
 
         .. note:: Betweenness centrality is an index of the relative importance
             of a node and it is defined by the number of shortest paths that run
@@ -729,27 +1320,117 @@ class GeneralGraph(nx.DiGraph):
             Nodes with the highest betweenness centrality hold the higher level
             of control on the information flowing between different nodes in
             the network, because more information will pass through them.
+            It is computed with Brandes' algorithm on the CSR representation
+            of the graph, and it is normalized by the total number of
+            source-target shortest paths.
+            When a single shortest path is taken into account, ties among
+            shortest paths of the same length are broken by Dijkstra's
+            method: each node is reached through the predecessor settled
+            first, i.e., for predecessors at the same distance, the first
+            one in the order of the nodes of the graph. Results may then
+            differ from the ones given by the Floyd-Warshall shortest paths
+            formerly used.
+
+        .. note:: In approximate mode, sources are sampled without
+            replacement, in batches whose size doubles at each iteration,
+            until the largest half-width of the confidence intervals is not
+            greater than epsilon, or the top_k nodes are separated from the
+            others (or every source has been sampled, giving the exact
+            result). Betweenness is estimated as the ratio between the
+            sampled dependencies and the sampled number of shortest paths,
+            and its variance with the delta method.
+        """
+
+        csr = self.csr_initialization()
+        n = len(self)
+
+        if not approximate:
+            betweenness, tot_shortest_paths = \
+                self.betweenness_centrality_sources(csr, list(range(n)),
+                all_shortest_paths)
+            if tot_shortest_paths:
+                betweenness = betweenness / tot_shortest_paths
+
+            nx.set_node_attributes(self,
+                dict(zip(map(self.ids.get, range(n)), betweenness.tolist())),
+                name="betweenness_centrality")
+            # forget the confidence intervals of previous estimates
+            for node in self:
+                self.nodes[node].pop("betweenness_centrality_ci", None)
+            return
+
+        z = norm.ppf(0.5 + confidence / 2.)
+        sources = np.random.RandomState(seed).permutation(n).tolist()
+        moments = None
+        n_sampled = 0
+        batch = min(n, max(32, getattr(self, "num", 1)))
+
+        while True:
+            batch_moments = self.betweenness_centrality_sources(csr,
+                sources[n_sampled:n_sampled + batch], all_shortest_paths,
+                approximate=True)
+            moments = batch_moments if moments is None else tuple(
+                m + bm for m, bm in zip(moments, batch_moments))
+            n_sampled += batch
+
+            sum_d, sum_p, sum_dd, sum_dp, sum_pp = moments
+            betweenness = sum_d / sum_p if sum_p else np.zeros(n)
+            if n_sampled > 1 and sum_p:
+                var_d = (sum_dd - 2 * betweenness * sum_dp +
+                    betweenness**2 * sum_pp) / (n_sampled - 1)
+                var = (1. - n_sampled / n) * np.maximum(var_d, 0.) / (
+                    n_sampled * (sum_p / n_sampled)**2)
+                half_width = z * np.sqrt(var)
+            else:
+                half_width = np.full(n, np.inf)
+
+            if n_sampled >= n:
+                half_width = np.zeros(n)
+                break
+            if half_width.max() <= epsilon:
+                break
+            if top_k is not None and 0 < top_k < n:
+                ranking = np.argsort(-betweenness, kind='stable')
+                top, others = ranking[:top_k], ranking[top_k:]
+                if ((betweenness[top] - half_width[top]).min() >
+                    (betweenness[others] + half_width[others]).max()):
+                    break
+            batch = min(n - n_sampled, n_sampled)
+
+        logging.debug("betweenness estimated from %d sources out of %d",
+            n_sampled, n)
+
+        nodi = list(map(self.ids.get, range(n)))
+        nx.set_node_attributes(self, dict(zip(nodi, betweenness.tolist())),
+            name="betweenness_centrality")
+        nx.set_node_attributes(self, dict(zip(nodi, zip(
+            np.maximum(betweenness - half_width, 0.).tolist(),
+            np.minimum(betweenness + half_width, 1.).tolist()))),
+            name="betweenness_centrality_ci")
+
+    @staticmethod
+    def closeness_centrality_kernel(dist, sources):
         """
 
-        tot_shortest_paths = nx.get_node_attributes(self, 'shortest_path')
-        tot_shortest_paths_list = []
+        Column reductions of a block of rows of the distance matrix,
+        needed by closeness centrality.
+
+        :param numpy.ndarray dist: block of rows of the distance matrix
+        :param list sources: indices of the source nodes the rows refer to
+
+        :return: for each target node, the number of sources (target
+            excluded) from which it can be reached, and the sum of the
+            lengths of the shortest paths from such sources
+        :rtype: tuple(numpy.ndarray, numpy.ndarray)
+        """
 
-        for node in self:
-            node_tot_shortest_paths = tot_shortest_paths[node]
-            for key, value in node_tot_shortest_paths.items():
-                if len(value) > 1:
-                    tot_shortest_paths_list.append(value)
-        length_tot_shortest_paths_list = len(tot_shortest_paths_list)
+        reachable = np.isfinite(dist)
+        reachable[np.arange(len(sources)), sources] = False
 
-        for node in self:
-            sp_with_node = []
-            for l in tot_shortest_paths_list:
-                if node in l and node != l[0] and node != l[-1]:
-                    sp_with_node.append(l)
+        n_paths = reachable.sum(axis=0)
+        sum_lengths = np.where(reachable, dist, 0.).sum(axis=0)
 
-            numb_sp_with_node = len(sp_with_node)
-            bet_cen = numb_sp_with_node / length_tot_shortest_paths_list
-            self.nodes[node]["betweenness_centrality"] = bet_cen
+        return n_paths, sum_lengths
 
     def closeness_centrality(self):
         """
@@ -763,30 +1444,71 @@ class GeneralGraph(nx.DiGraph):
             it is to all other nodes. This measure allows to identify good
             broadcasters, that is key elements in a graph, depicting how
             closely the nodes are connected with each other.
+            It is computed from the column reductions of the
+            distance matrix (or from their accumulators, in streaming mode).
+        """
+
+        g_len = len(list(self))
+        if self.streaming:
+            n_paths, sum_lengths = self.closeness_reductions
+        else:
+            n_paths, sum_lengths = self.closeness_centrality_kernel(self.dist,
+                list(range(g_len)))
+
+        clo_cen = np.zeros(g_len)
+        np.divide(n_paths**2 / (g_len - 1), sum_lengths, out=clo_cen,
+            where=(sum_lengths != 0))
+
+        nx.set_node_attributes(self,
+            dict(zip(map(self.ids.get, range(g_len)), clo_cen.tolist())),
+            name="closeness_centrality")
+
+    @staticmethod
+    def degree_centrality_kernel(csr):
+        """
+
+        Weighted indegree, outdegree and degree of each node, computed in a
+        single pass over the CSR representation of the graph.
+
+        :param scipy.sparse.csr_matrix csr: weighted adjacency matrix
+
+        :return: the weighted indegree, outdegree and degree of the nodes
+        :rtype: tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray)
+        """
+
+        n = csr.shape[0]
+        sources = np.repeat(np.arange(n), np.diff(csr.indptr))
+
+        in_degree = np.bincount(csr.indices, weights=csr.data, minlength=n)
+        out_degree = np.bincount(sources, weights=csr.data, minlength=n)
+
+        return in_degree, out_degree, in_degree + out_degree
+
+    def degree_centralities(self, fields=("indegree_centrality",
+        "outdegree_centrality", "degree_centrality")):
+        """
+
+        Indegree, outdegree and degree centrality measures of each node,
+        computed all together.
+        Nodes' "indegree_centrality", "outdegree_centrality" and
+        "degree_centrality" attributes are evaluated.
+
+        :param fields: centrality measures to be evaluated,
+            among the default ones
+        :type fields: tuple, optional
         """
 
         g_len = len(list(self))
-        tot_shortest_paths = nx.get_node_attributes(self, 'shortest_path')
-        tot_shortest_paths_list = []
-
-        for node in self:
-            node_tot_shortest_paths = tot_shortest_paths[node]
-            for key, value in node_tot_shortest_paths.items():
-                if len(value) > 1:
-                    tot_shortest_paths_list.append(value)
-
-        for node in self:
-            totsp = []
-            sp_with_node = []
-            for l in tot_shortest_paths_list:
-                if node in l and node == l[-1]:
-                    sp_with_node.append(l)
-                    length_path = self.nodes[l[0]]["shpath_length"][l[-1]]
-                    totsp.append(length_path)
-            norm = len(totsp) / (g_len - 1)
-            clo_cen = (
-                len(totsp) / sum(totsp)) * norm if (sum(totsp)) != 0 else 0
-            self.nodes[node]["closeness_centrality"] = clo_cen
+        centralities = dict(zip(
+            ("indegree_centrality", "outdegree_centrality",
+            "degree_centrality"),
+            self.degree_centrality_kernel(self.csr_initialization())))
+        nodi = list(map(self.ids.get, range(g_len)))
+
+        for field in fields:
+            nx.set_node_attributes(self,
+                dict(zip(nodi, (centralities[field] / (g_len - 1)).tolist())),
+                name=field)
 
     def degree_centrality(self):
         """
@@ -802,14 +1524,7 @@ class GeneralGraph(nx.DiGraph):
             A node with high degree centrality is a node with many dependencies.
         """
 
-        #TODO: it can be trivially parallelized
-        #(see single_source_shortest_path_parallel for the way to go)
-        g_len = len(list(self))
-
-        for node in self:
-            num_neighbor_nodes = self.degree(node, weight = 'weight')
-            deg_cen = num_neighbor_nodes / (g_len - 1)
-            self.nodes[node]["degree_centrality"] = deg_cen
+        self.degree_centralities(fields=("degree_centrality",))
 
     def indegree_centrality(self):
         """
@@ -822,17 +1537,7 @@ class GeneralGraph(nx.DiGraph):
             centrality are called cascade resulting nodes.
         """
 
-        #TODO: it can be trivially parallelized
-        #(see single_source_shortest_path_parallel for the way to go)
-        g_len = len(list(self))
-        
-        for node in self:
-            num_incoming_nodes = self.in_degree(node, weight = 'weight')
-            if num_incoming_nodes > 0:
-                in_cen = num_incoming_nodes / (g_len - 1)
-                self.nodes[node]["indegree_centrality"] = in_cen
-            else:
-                self.nodes[node]["indegree_centrality"] = 0
+        self.degree_centralities(fields=("indegree_centrality",))
 
     def outdegree_centrality(self):
         """
@@ -845,17 +1550,7 @@ class GeneralGraph(nx.DiGraph):
             centrality are called cascade inititing nodes.
         """
 
-        #TODO: it can be trivially parallelized
-        #(see single_source_shortest_path_parallel for the way to go)
-        g_len = len(list(self))
-        
-        for node in self:
-            num_outcoming_nodes = self.out_degree(node, weight = 'weight')
-            if num_outcoming_nodes > 0:
-                out_cen = num_outcoming_nodes / (g_len - 1)
-                self.nodes[node]["outdegree_centrality"] = out_cen
-            else:
-                self.nodes[node]["outdegree_centrality"] = 0
+        self.degree_centralities(fields=("outdegree_centrality",))
 
     def calculate_shortest_path(self):
         """
@@ -872,6 +1567,9 @@ class GeneralGraph(nx.DiGraph):
 
         For small graphs go serial.
 
+        In streaming mode, only the accumulators needed by the efficiency
+        and closeness measures and the service paths are evaluated.
+
         .. note:: Edge weights of the graph are taken into account in the computation.
         """
 
@@ -882,7 +1580,13 @@ class GeneralGraph(nx.DiGraph):
         print("PROC NUM", self.num)
 
         print("In the graph are present", n_of_nodes, "nodes")
-        if n_of_nodes > 10000:
+        if self.streaming:
+            print("go streaming!")
+            self.streaming_shortest_path()
+        elif getattr(self, "apsp_removals", None) is not None:
+            print("go decremental!")
+            self.decremental_shortest_path()
+        elif n_of_nodes > 10000:
             print("go parallel!")
             if g_density <= 0.000001:
                 print("the graph is sparse, density =", g_density)
@@ -899,254 +1603,1925 @@ class GeneralGraph(nx.DiGraph):
                 print("the graph is dense, density =", g_density)
                 self.floyd_warshall_predecessor_and_distance_serial()
 
-    def check_before(self):
+        self.apsp_removals = None if self.streaming else (set(), set())
+
+    def decremental_shortest_path(self):
         """
 
-        Describe the topology of the integer graph, before the
-        occurrence of any perturbation in the system.
-        Compute efficiency measures for the whole graph and its nodes.
-        Check the availability of paths between source and target nodes.
+        Update the all-pairs shortest paths after the removal of nodes and
+        edges, reusing the distance and predecessors matrices. The SSSP is
+        computed again only from the sources whose shortest path tree
+        contains a removed edge, or a removed node other than as a leaf:
+        from the other sources, paths are unchanged.
+        The nested dictionaries for shortest-path and length of the paths
+        attributes are updated, together with the distance matrix.
+        For big graphs go parallel (number of processes equals the total
+        number of available CPUs), for small graphs go serial.
+
+        .. note:: Distances are the ones computed from scratch, while ties
+            between shortest paths of the same length may be broken
+            differently.
         """
 
-        self.calculate_shortest_path()
-        self.lst0 = []
-        self.nodal_efficiency()
-        self.global_efficiency()
-        self.local_efficiency()
+        removed_nodes, removed_edges = self.apsp_removals
+        old_ids_reversed = self.ids_reversed
 
-        for ii in self.services_SOURCE:
-            i = list(self.Mark.keys())[list(self.Mark.values()).index(ii)]
-            for jj in self.services_USER:
-                j = list(self.Mark.keys())[list(self.Mark.values()).index(jj)]
-                if i in self.nodes() and j in self.nodes():
-                    if nx.has_path(self, i, j):
-
-                        osip = list(nx.all_simple_paths(self, i, j))
-                        oshp = self.nodes[i]["shortest_path"][j]
-                        oshpl = self.nodes[i]["shpath_length"][j]
-                        oeff = 1 / oshpl
-                        ids = ii + jj
-
-                        self.lst0.append({
-                            'from':
-                            ii,
-                            'to':
-                            jj,
-                            'original_shortest_path_length':
-                            oshpl,
-                            'original_shortest_path':
-                            oshp,
-                            'original_simple path':
-                            osip,
-                            'original_pair_efficiency':
-                            oeff,
-                            'ids':
-                            ids
-                        })
-
-                    else:
-                        oshpl = "NO_PATH"
-                        osip = "NO_PATH"
-                        oshp = "NO_PATH"
-                        oeff = "NO_PATH"
-                        ids = ii + jj
-
-                        self.lst0.append({
-                            'from':
-                            ii,
-                            'to':
-                            jj,
-                            'original_shortest_path_length':
-                            oshpl,
-                            'original_shortest_path':
-                            oshp,
-                            'original_simple path':
-                            osip,
-                            'original_pair_efficiency':
-                            oeff,
-                            'ids':
-                            ids
-                        })
+        affected = np.isin(self.shpath_pred, [old_ids_reversed[n]
+            for n in removed_nodes if n in old_ids_reversed]).any(axis=1)
+        for u, v in removed_edges:
+            if u in old_ids_reversed and v in old_ids_reversed:
+                affected |= self.shpath_pred[:, old_ids_reversed[v]] == \
+                    old_ids_reversed[u]
 
-                else:
+        keep = np.array([old_ids_reversed[n] for n in self], dtype=int)
+        new_index = np.full(len(old_ids_reversed) + 1, -1, dtype=np.int32)
+        new_index[keep] = np.arange(len(keep))
 
-                    oshpl = "NO_PATH"
-                    osip = "NO_PATH"
-                    oshp = "NO_PATH"
-                    oeff = "NO_PATH"
-                    ids = ii + jj
-
-                    self.lst0.append({
-                        'from': ii,
-                        'to': jj,
-                        'original_shortest_path_length': oshpl,
-                        'original_shortest_path': oshp,
-                        'original_simple path': osip,
-                        'original_pair_efficiency': oeff,
-                        'ids': ids
-                    })
+        self.dist = self.dist[np.ix_(keep, keep)]
+        self.shpath_pred = new_index[self.shpath_pred[np.ix_(keep, keep)]]
+        self.ids = dict(enumerate(self))
+        self.ids_reversed = { value: key for key, value in self.ids.items() }
+
+        sources = [n for n in self if affected[old_ids_reversed[n]]]
+        for n in self:
+            paths = self.nodes[n]["shortest_path"]
+            lengths = self.nodes[n]["shpath_length"]
+            if (not affected[old_ids_reversed[n]] and
+                not removed_nodes.isdisjoint(paths)):
+                # dictionaries may be shared with a copy (see structural_copy)
+                self.nodes[n]["shortest_path"] = {target: path
+                    for target, path in paths.items()
+                    if target not in removed_nodes}
+                self.nodes[n]["shpath_length"] = {target: length
+                    for target, length in lengths.items()
+                    if target not in removed_nodes}
+
+        if len(self) > 10000 and sources:
+            out_q = Queue()
+            node_chunks = self.chunk_it(sources, self.num)
+
+            processes = [
+                mp.Process( target=self.single_source_shortest_path_parallel,
+                args=( out_q,node_chunks[p] ))
+                for p in range(len(node_chunks)) ]
+
+            for proc in processes:
+                proc.start()
+
+            ssspps = [out_q.get() for n in sources]
+
+            for proc in processes:
+                proc.join()
+        else:
+            ssspps = [(n, nx.single_source_dijkstra(self, n, weight = 'weight'))
+                for n in sources]
 
-    def check_after(self):
+        for n, (lengths, paths) in ssspps:
+            self.nodes[n]["shortest_path"] = paths
+            self.nodes[n]["shpath_length"] = lengths
+            self.shpath_to_matrix_row(n)
+
+    def shortest_paths_updated(self):
         """
 
-        Describe the topology of the potentially perturbed graph,
-        after the occurrence of a perturbation in the system.
-        Compute efficiency measures for the whole graph and its nodes.
-        Check the availability of paths between source and target nodes.
+        Bring the all-pairs shortest paths up to date, if only nodes and
+        edges have been removed since they were last computed.
+
+        :return: True if the distance and predecessors matrices, together
+            with the nested dictionaries for shortest-path and length of
+            the paths attributes, are up to date, False if they have never
+            been computed, or if they must be computed from scratch
+        :rtype: bool
+        """
+
+        removals = getattr(self, "apsp_removals", None)
+        if self.streaming or removals is None:
+            return False
+
+        if removals[0] or removals[1]:
+            self.calculate_shortest_path()
+
+        return True
+
+    def relax_edge(self, u, v, weight):
         """
 
-        self.calculate_shortest_path()
-        self.nodal_efficiency()
-        self.global_efficiency()
-        self.local_efficiency()
+        Update the all-pairs shortest paths after the edge from u to v
+        has been added, or its weight has been decreased: a path improves
+        if and only if it goes through the edge, so each distance is
+        relaxed at once with the distances to u and from v.
+
+        :param u: edge tail
+        :param v: edge head
+        :param float weight: edge weight
 
-        for nn in self.services_SOURCE:
-            n = list(self.Mark.keys())[list(self.Mark.values()).index(nn)]
-            for OODD in self.services_USER:
-                OD = list(self.Mark.keys())[list(
-                    self.Mark.values()).index(OODD)]
+        :return: indices of the sources whose distances have changed
+        :rtype: numpy.ndarray
+        """
 
-                if n in self.nodes() and OD in self.nodes():
-                    if nx.has_path(self, n, OD):
+        iu, iv = self.ids_reversed[u], self.ids_reversed[v]
+        through = self.dist[:, iu, None] + weight + self.dist[None, iv, :]
+        improved = through < self.dist
+        sources, targets = np.nonzero(improved)
 
-                        sip = list(nx.all_simple_paths(self, n, OD))
+        pred = np.broadcast_to(self.shpath_pred[iv],
+            self.shpath_pred.shape).copy()
+        pred[:, iv] = iu
+        self.dist = np.where(improved, through, self.dist)
+        self.shpath_pred = np.where(improved, pred, self.shpath_pred)
 
-                        set_sip = set(x for lst in sip for x in lst)
+        # dictionaries may be shared with a copy (see structural_copy)
+        for s in map(self.ids.get, np.unique(sources).tolist()):
+            self.nodes[s]["shortest_path"] = dict(self.nodes[s]["shortest_path"])
+            self.nodes[s]["shpath_length"] = dict(self.nodes[s]["shpath_length"])
 
-                        for node in set_sip:
+        paths_from_v = self.nodes[v]["shortest_path"]
+        for i, j in zip(sources.tolist(), targets.tolist()):
+            s, t = self.ids[i], self.ids[j]
+            self.nodes[s]["shortest_path"][t] = \
+                self.nodes[s]["shortest_path"][u] + paths_from_v[t]
+            self.nodes[s]["shpath_length"][t] = float(self.dist[i, j])
 
-                            if self.D[node] in self.valv:
+        return np.unique(sources)
 
-                                if node in self.newstatus:
+    def update_original_efficiency(self, sources, nodes, metrics):
+        """
 
-                                    if self.newstatus[node] == "1":
+        Update the efficiency measures of the intact graph computed so far,
+        after the distances from some sources have changed, without
+        computing them again for all the nodes.
 
-                                        logging.debug(
-                                            "valve %s at node %s, state %s",
-                                            self.D[node], node, self.valv[self.D[node]]["1"])
+        :param numpy.ndarray sources: indices of the sources whose distances
+            have changed
+        :param nodes: nodes whose outgoing neighbors have changed
+        :type nodes: iterable
+        :param metrics: efficiency measures computed so far
+        :type metrics: iterable
+        """
 
-                                    elif self.newstatus[node] == "0":
+        if "nodal_efficiency" not in metrics:
+            return
 
-                                        self.finalstatus.update({node: "1"})
-                                        
-                                        logging.debug(
-                                            "valve %s at node %s, from %s to %s",
-                                            self.D[node], node, self.valv[self.D[node]]["0"],
-                                            self.valv[self.D[node]]["1"])
-                                else:
-                                    if self.status[node] == "1":
+        changed = list(map(self.ids.get, sources.tolist()))
+        nodal_eff = self.compute_efficiency(self.dist[sources]).sum(axis=1)
+        nx.set_node_attributes(self, dict(zip(changed,
+            (nodal_eff / (len(self) - 1)).tolist())), name="original_nodal_eff")
+        self.computed_metrics.add("nodal_efficiency")
 
-                                        logging.debug(
-                                            "valve %s at node %s, state %s",
-                                            self.D[node], node, self.valv[self.D[node]]["1"])
-                                    elif self.status[node] == "0":
+        nodal_eff = nx.get_node_attributes(self, "original_nodal_eff")
+        if "global_efficiency" in metrics:
+            nx.set_node_attributes(self,
+                float(np.mean(list(nodal_eff.values()))),
+                name="original_avg_global_eff")
+            self.computed_metrics.add("global_efficiency")
 
-                                        self.finalstatus.update({node: "1"})
+        if "local_efficiency" in metrics:
+            neighbors = set(chain(nodes,
+                *(self.predecessors(n) for n in changed)))
+            nx.set_node_attributes(self, {n: float(np.mean(
+                [nodal_eff[succ] for succ in self[n]])) if self[n] else 0.
+                for n in neighbors}, name="original_local_eff")
+            self.computed_metrics.add("local_efficiency")
 
-                                        logging.debug(
-                                            "valve %s at node %s, from %s to %s",
-                                            self.D[node], node, self.valv[self.D[node]]["0"],
-                                            self.valv[self.D[node]]["1"])
+    def add_edge_incremental(self, u, v, **attr):
+        """
 
-                        shp = self.nodes[n]["shortest_path"][OD]
-                        shpl = self.nodes[n]["shpath_length"][OD]
-                        neff = 1 / shpl
-                        ids = nn + OODD
+        Add an edge to the intact graph, updating the shortest paths and
+        the efficiency measures computed so far, without computing again
+        the shortest paths between all the pairs of nodes.
 
-                    else:
+        :param u: edge tail
+        :param v: edge head
+        :param attr: edge attributes (the default weight is 1, and the
+            default "Father_cond" is "SINGLE")
 
-                        shpl = "NO_PATH"
-                        sip = "NO_PATH"
-                        shp = "NO_PATH"
-                        neff = "NO_PATH"
-                        ids = nn + OODD
+        .. note:: If u or v is a new node, if the edge already exists with
+            a smaller weight, or if the shortest paths have never been
+            computed (or they are computed in streaming mode), the edge is
+            simply added, and everything is computed again from scratch
+            when requested.
+        """
 
-                else:
-                    shpl = "NO_PATH"
-                    sip = "NO_PATH"
-                    shp = "NO_PATH"
-                    neff = "NO_PATH"
-                    ids = nn + OODD
-
-                self.lst.append({
-                    'from': nn,
-                    'area': self.area[n],
-                    'to': OODD,
-                    'final_shortest_path_length': shpl,
-                    'final_shortest_path': shp,
-                    'final_simple_path': sip,
-                    'final_pair_efficiency': neff,
-                    'ids': ids
-                })
-
-    def rm_nodes(self, node, visited=None):
+        weight = attr.get("weight", 1)
+        metrics = getattr(self, "computed_metrics", set())
+        incremental = (u in self and v in self and
+            self.get_edge_data(u, v, {"weight": np.inf}).get("weight", 1)
+            >= weight and self.shortest_paths_updated())
+
+        self.add_edge(u, v, **attr)
+
+        if hasattr(self, "condition"):
+            # the perturbation propagation reads the edge condition, as
+            # loaded from the input file (see load)
+            self.condition[(u, v)] = self.edges[u, v].get("Father_cond",
+                "SINGLE")
+            self.Service[(u, v)] = self.edges[u, v].get("weight", 1)
+            for n in (u, v):
+                self.D.setdefault(n, self.nodes[n].get("Description", ""))
+
+        if incremental:
+            self.apsp_removals = (set(), set())
+            self.computed_metrics = {"calculate_shortest_path"}
+            sources = self.relax_edge(u, v, weight)
+            self.update_original_efficiency(sources, [u], metrics)
+
+    def decrease_edge_weight(self, u, v, weight):
+        """
+
+        Decrease the weight of an edge of the intact graph, updating the
+        shortest paths and the efficiency measures computed so far, without
+        computing again the shortest paths between all the pairs of nodes.
+
+        :param u: edge tail
+        :param v: edge head
+        :param float weight: new edge weight
+
+        .. note:: If the weight is increased, the shortest paths are
+            computed again from scratch when requested.
+        """
+
+        self.add_edge_incremental(u, v, weight=weight)
+
+    def service_pairs(self):
+        """
+
+        Pairs of SOURCE and USER services, together with the ids of the
+        corresponding nodes.
+
+        :return: for each pair, the SOURCE and USER "Mark" attributes and
+            the ids of the SOURCE and USER nodes
+        :rtype: list
+        """
+
+        marks = { value: key for key, value in reversed(list(self.Mark.items())) }
+
+        return [ (ii, jj, marks[ii], marks[jj])
+            for ii in self.services_SOURCE for jj in self.services_USER ]
+
+    def service_paths_kernel(self, pairs, lengths, update_valves=False):
+        """
+
+        Shortest path, simple paths (or their number, depending on
+        simple_paths_policy) and efficiency of the connected pairs of
+        SOURCE and USER nodes.
+        Optionally, open the valves lying on the simple paths.
+
+        .. note:: Simple paths are listed up to max_simple_paths
+            (1000 by default) for each pair, since they are kept in memory
+            until the service paths are written to file: a warning is
+            logged for the pairs whose paths are bounded.
+
+        :param list pairs: pairs of SOURCE and USER services,
+            see service_pairs
+        :param list lengths: length of the shortest path of each pair,
+            infinite if the USER can not be reached from the SOURCE
+        :param bool update_valves: if True, valves on the simple paths
+            are opened; default to False
+
+        :return: for each pair, the shortest path, its length, the simple
+            paths (their number, or " ") and the pair efficiency
+            (or "NO_PATH"), and the updates to the final status of the valves
+        :rtype: tuple(list, dict)
+        """
+
+        records = []
+        finalstatus = {}
+        descendants, ancestors = {}, {}
+        if update_valves:
+            cyclic = set(chain.from_iterable(c for c in
+                nx.strongly_connected_components(self) if len(c) > 1))
+
+        for (ii, jj, i, j), length in zip(pairs, lengths):
+            if length == np.inf:
+                records.append(("NO_PATH", "NO_PATH", "NO_PATH", "NO_PATH"))
+                continue
+
+            path, length = self.service_shortest_path(i, j)
+            if self.simple_paths_policy == "all":
+                simple_paths = list(self.simple_paths_kernel(self, i, j,
+                    self.max_simple_paths, self.simple_paths_cutoff,
+                    self.simple_paths_time_budget))
+                if len(simple_paths) == self.max_simple_paths:
+                    logging.warning(
+                        "simple paths from %s to %s bounded to the first %d",
+                        ii, jj, self.max_simple_paths)
+            elif self.simple_paths_policy == "count":
+                simple_paths = sum(1 for _ in self.simple_paths_kernel(self,
+                    i, j, self.max_simple_paths, self.simple_paths_cutoff,
+                    self.simple_paths_time_budget))
+            else:
+                simple_paths = " "
+
+            if update_valves:
+                if i not in descendants:
+                    descendants[i] = nx.descendants(self, i) | {i}
+                if j not in ancestors:
+                    ancestors[j] = nx.ancestors(self, j) | {j}
+
+                for node in self.service_valves(i, j, descendants[i],
+                    ancestors[j], cyclic):
+                    status = self.newstatus.get(node, self.status[node])
+                    if status == "1":
+                        logging.debug(
+                            "valve %s at node %s, state %s",
+                            self.D[node], node, self.valv[self.D[node]]["1"])
+                    elif status == "0":
+                        finalstatus[node] = "1"
+                        logging.debug(
+                            "valve %s at node %s, from %s to %s",
+                            self.D[node], node, self.valv[self.D[node]]["0"],
+                            self.valv[self.D[node]]["1"])
+
+            records.append((path, length, simple_paths, 1 / length))
+
+        return records, finalstatus
+
+    def service_valves(self, source, target, descendants, ancestors, cyclic):
+        """
+
+        Valves lying on some simple path between a SOURCE and a USER node.
+        Candidates are the valves reachable from the SOURCE and from which
+        the USER can be reached: a candidate which is not on a cycle lies
+        on a simple path. A candidate on a cycle is kept if the USER can be
+        reached from it without going through its dominators (the nodes
+        which all the paths from the SOURCE to it go through), and it can
+        be reached from the SOURCE without going through its
+        postdominators (the nodes which all the paths from it to the USER
+        go through).
+
+        :param source: SOURCE node
+        :param target: USER node
+        :param set descendants: nodes reachable from the SOURCE,
+            SOURCE included
+        :param set ancestors: nodes from which the USER can be reached,
+            USER included
+        :param set cyclic: nodes lying on a cycle of the graph
+
+        :return: the valves on some simple path
+        :rtype: list
+
+        .. note:: Deciding whether a node on a cycle lies on a simple path
+            is as hard as the two disjoint paths problem, so the dominators
+            test may keep a valve which only lies on paths with repeated
+            nodes; valves which are not on a cycle are never misjudged.
+        """
+
+        nodes = descendants & ancestors
+        valves = [ node for node in nodes if self.D[node] in self.valv ]
+
+        if cyclic.intersection(valves):
+            graph = self.subgraph(nodes)
+            reverse = graph.reverse(copy=False)
+            dominators = nx.immediate_dominators(graph, source)
+            postdominators = nx.immediate_dominators(reverse, target)
+
+            def chain_up(idom, node):
+                while idom[node] != node:
+                    node = idom[node]
+                    yield node
+
+            def reaches(graph, node, other, avoid):
+                return other not in avoid and nx.has_path(
+                    nx.restricted_view(graph, avoid, []), node, other)
+
+            valves = [ node for node in valves if node not in cyclic or (
+                reaches(graph, node, target, set(chain_up(dominators, node)))
+                and reaches(reverse, node, source,
+                set(chain_up(postdominators, node)))) ]
+
+        return valves
+
+    def service_paths_iteration_parallel(self, out_q, start, pairs, lengths,
+        update_valves):
+        """
+
+        Parallel evaluation of the paths between pairs of SOURCE and USER
+        nodes.
+
+        :param multiprocessing.queues.Queue out_q: multiprocessing queue
+        :param int start: position of the first pair among all the pairs
+        :param list pairs: pairs of SOURCE and USER services
+        :param list lengths: length of the shortest path of each pair
+        :param bool update_valves: if True, valves on the simple paths
+            are opened
+        """
+
+        out_q.put((start, *self.service_paths_kernel(pairs, lengths,
+            update_valves)))
+
+    def service_paths(self, pairs, update_valves=False):
+        """
+
+        Paths between pairs of SOURCE and USER nodes. The length of all the
+        shortest paths is looked up at once in the distance matrix (or
+        among the service paths, in streaming mode).
+        For many pairs go parallel (number of processes equals the total
+        number of available CPUs), splitting the pairs by SOURCE, for few
+        pairs go serial.
+        Valves' "finalstatus" is updated if update_valves is True.
+
+        :param list pairs: pairs of SOURCE and USER services,
+            see service_pairs
+        :param bool update_valves: if True, valves on the simple paths
+            are opened; default to False
+
+        :return: for each pair, the shortest path, its length, the simple
+            paths and the pair efficiency (or "NO_PATH"). Depending on
+            simple_paths_policy, simple paths are listed, counted or " "
+        :rtype: list
+        """
+
+        lengths = np.full(len(pairs), np.inf)
+        connected = [ k for k, (ii, jj, i, j) in enumerate(pairs)
+            if i in self and j in self ]
+
+        if self.streaming:
+            for k in connected:
+                service_path = self.service_shortest_paths.get(pairs[k][2:])
+                if service_path:
+                    lengths[k] = service_path[1]
+        elif connected:
+            rows = [self.ids_reversed[pairs[k][2]] for k in connected]
+            cols = [self.ids_reversed[pairs[k][3]] for k in connected]
+            lengths[connected] = self.dist[rows, cols]
+
+        if len(pairs) > 10000:
+            out_q = Queue()
+            n_users = len(self.services_USER)
+            source_chunks = self.chunk_it(list(range(len(pairs) // n_users)),
+                self.num)
+            starts = [n_users * chunk[0] for chunk in source_chunks if chunk]
+            ends = starts[1:] + [len(pairs)]
+
+            processes = [
+                mp.Process( target=self.service_paths_iteration_parallel,
+                args=(out_q, start, pairs[start:end], lengths[start:end],
+                update_valves))
+                for start, end in zip(starts, ends) ]
+
+            for proc in processes:
+                proc.start()
+
+            results = sorted((out_q.get() for proc in processes),
+                key=lambda result: result[0])
+
+            for proc in processes:
+                proc.join()
+        else:
+            results = [(0, *self.service_paths_kernel(pairs, lengths,
+                update_valves))]
+
+        records = []
+        for start, chunk_records, finalstatus in results:
+            records.extend(chunk_records)
+            self.finalstatus.update(finalstatus)
+
+        return records
+
+    @staticmethod
+    def simple_paths_kernel(graph, source, target, max_paths=None,
+        cutoff=None, time_budget=None):
+        """
+
+        Generate lazily the simple paths between a SOURCE and a USER node,
+        with a depth first search that checks the time budget at every
+        step, also while no path is found.
+
+        :param networkx.DiGraph graph: graph in which to look for the paths
+        :param source: SOURCE node
+        :param target: USER node
+        :param int max_paths: maximum number of paths, default to None
+            (no limit)
+        :param int cutoff: maximum number of edges in a path, default to None
+            (no limit)
+        :param float time_budget: maximum time spent in the enumeration,
+            in seconds, default to None (no limit)
+
+        :return: generator of the simple paths, each one a list of nodes
+        :rtype: generator
+        """
+
+        start = time.time()
+        if cutoff is None:
+            cutoff = len(graph) - 1
+        if source == target or cutoff < 1:
+            return
+
+        # depth first search, with the nodes of the current path in order
+        visited = {source: None}
+        stack = [iter(graph[source])]
+        n_paths = 0
+
+        while stack:
+            if time_budget is not None and time.time() - start > time_budget:
+                return
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                visited.popitem()
+            elif child in visited:
+                continue
+            elif child == target:
+                if max_paths is not None and n_paths >= max_paths:
+                    return
+                n_paths += 1
+                yield list(visited) + [child]
+            elif len(visited) < cutoff:
+                visited[child] = None
+                stack.append(iter(graph[child]))
+
+    def compute_metrics(self, *metrics):
+        """
+
+        Compute the requested metrics, together with the metrics they
+        depend on (see metrics_dependencies), unless they have already been
+        computed since the last change in the graph nodes or edges.
+
+        :param str metrics: names of the metrics to be computed
+
+        .. note:: Metrics are computed again only after the graph has been
+            changed through add_node, add_edge, remove_node, remove_edge
+            (and the like), or after invalidate_metrics. Changes to the
+            attributes of nodes and edges are not tracked.
+        """
+
+        if not hasattr(self, "computed_metrics"):
+            self.computed_metrics = set()
+
+        for metric in metrics:
+            if metric in self.computed_metrics:
+                continue
+            self.compute_metrics(*self.metrics_dependencies[metric])
+            getattr(self, metric)()
+            self.computed_metrics.add(metric)
+
+    def check_before(self, metrics=efficiency_metrics):
+        """
+
+        Describe the topology of the integer graph, before the
+        occurrence of any perturbation in the system.
+        Compute efficiency measures (or the requested metrics) for the
+        whole graph and its nodes.
+        Check the availability of paths between source and target nodes.
+
+        :param metrics: names of the metrics to be computed,
+            default to efficiency measures
+        :type metrics: tuple, optional
+
+        .. note:: Metrics and paths are not computed again if they have
+            already been computed since the last change in the graph nodes
+            or edges (see compute_metrics).
+        """
+
+        self.compute_metrics("calculate_shortest_path", *metrics)
+        if getattr(self, "described", False):
+            # the intact graph has not changed since it was last described
+            return
+
+        self.lst0 = []
+
+        pairs = self.service_pairs()
+        for (ii, jj, i, j), (oshp, oshpl, osip, oeff) in zip(pairs,
+            self.service_paths(pairs)):
+
+            self.lst0.append({
+                'from': ii,
+                'to': jj,
+                'original_shortest_path_length': oshpl,
+                'original_shortest_path': oshp,
+                'original_simple path': osip,
+                'original_pair_efficiency': oeff,
+                'ids': ii + jj
+            })
+
+        self.described = True
+
+    def check_after(self, metrics=efficiency_metrics):
+        """
+
+        Describe the topology of the potentially perturbed graph,
+        after the occurrence of a perturbation in the system.
+        Compute efficiency measures (or the requested ones) for the whole
+        graph and its nodes.
+        Check the availability of paths between source and target nodes.
+
+        :param metrics: names of the metrics requested for the
+            perturbation, among which only efficiency measures are computed
+            again; default to efficiency measures
+        :type metrics: tuple, optional
+        """
+
+        self.compute_metrics("calculate_shortest_path",
+            *[m for m in metrics if m in self.efficiency_metrics])
+
+        pairs = self.service_pairs()
+        for (nn, OODD, n, OD), (shp, shpl, sip, neff) in zip(pairs,
+            self.service_paths(pairs, update_valves=True)):
+
+            self.lst.append({
+                'from': nn,
+                'area': self.area[n],
+                'to': OODD,
+                'final_shortest_path_length': shpl,
+                'final_shortest_path': shp,
+                'final_simple_path': sip,
+                'final_pair_efficiency': neff,
+                'ids': nn + OODD
+            })
+
+    def rm_nodes(self, node, visited=None, removed=frozenset(),
+        broken_preds=None):
         """
 
         Remove nodes from the graph in a depth first search way to
         propagate the perturbation.
+        The search keeps an explicit stack of successors to visit, so deep
+        graphs do not hit the recursion limit, and the broken nodes are
+        stored in the set self.broken.
 
         :param str node: the id of the node to remove
         :param visited: list of nodes already visited
         :type visited: set, optional
+        :param removed: nodes already removed by previous perturbations,
+            which are considered as not in the graph
+        :type removed: set, optional
+        :param broken_preds: number of broken or removed predecessors
+            of each node, updated during the propagation
+        :type broken_preds: collections.Counter, optional
+
+        :return: the visited nodes
+        :rtype: set
+
+        .. note:: A node is broken if it is the node to remove, if it is
+            not a valve and its predecessors are not in OR, or if all its
+            predecessors in OR are already broken when it is visited.
+            Valves are closed, and stop the propagation unless they are
+            the node to remove.
         """
 
         if visited is None:
             visited = set()
-        visited.add(node)
-        logging.debug('visited: %s', visited)
-        logging.debug('node: %s', node)
 
-        if self.D[node] in self.valv:
+        broken = self.broken
+        if broken_preds is None:
+            broken_preds = Counter(
+                succ for n in broken if n in self for succ in self[n])
+        conditions = {}
+        stack = [iter((node, ))]
 
-            if self.status[node] == "0":
-                logging.debug('valve %s at node %s, state %s',
-                self.D[node], node, self.valv[self.D[node]]["0"])
+        while stack:
+            for n in stack[-1]:
+                break
+            else:
+                stack.pop()
+                continue
 
-            elif self.status[node] == "1":
-                self.newstatus.update({node: "0"})
-                logging.debug(
-                    'valve %s at node %s, from %s to %s',
-                    self.D[node], node, self.valv[self.D[node]]["1"],
-                    self.valv[self.D[node]]["0"])
+            if n in broken and n in visited:
+                # all its successors have already been visited
+                continue
 
-            if len(visited) == 1:
-                self.broken.append((node, "NULL"))
-                logging.debug("broken1: %s", self.broken)
+            visited.add(n)
+            source = len(visited) == 1
+
+            if self.D[n] in self.valv:
+                if self.status[n] == "1":
+                    self.newstatus[n] = "0"
+                if not source:
+                    continue
 
             else:
-                return visited
+                if n not in conditions:
+                    conditions[n] = {
+                        self.condition[(p, n)] for p in self.predecessors(n)
+                        if p not in removed
+                    } or {"SINGLE"}
+                if (not source and list(conditions[n])[0] == "OR" and
+                    broken_preds[n] < self.in_degree(n)):
+                    continue
 
+            broken.add(n)
+            for succ in self[n]:
+                broken_preds[succ] += 1
+            stack.append(iter(
+                {succ for succ in self[n] if succ not in removed} - visited))
+
+        logging.debug("broken: %d nodes", len(broken))
+
+        return visited
+
+    def rm_multiple_nodes(self, nodes):
+        """
+
+        Propagate the perturbation from several nodes in a single pass,
+        without modifying the graph: the perturbation from each node is
+        propagated as if the nodes broken by the previous ones had already
+        been removed, as in a sequence of rm_nodes calls each followed by
+        the removal of the broken nodes.
+        Broken nodes are stored in the set self.broken.
+
+        :param list nodes: ids of the nodes to remove, in order
+
+        :return: the broken nodes
+        :rtype: set
+        """
+
+        removed = set()
+        broken_preds = Counter()
+
+        for node in nodes:
+            if node in self and node not in removed:
+                self.broken = set()
+                self.rm_nodes(node, removed=removed, broken_preds=broken_preds)
+                removed |= self.broken
+
+        self.broken = removed
+
+        return removed
+
+    def rm_edges(self, edges):
+        """
+
+        Propagate the perturbation from the failure of several edges, which
+        must have already been removed from the graph, without removing
+        any node: the head of each failed edge loses that predecessor, and
+        the perturbation is propagated from it as in rm_nodes if it breaks.
+        Broken nodes are stored in the set self.broken.
+
+        :param list edges: (tail, head) pairs of the failed edges, in order
+
+        :return: the broken nodes
+        :rtype: set
+
+        .. note:: The head of a failed edge is broken if it is not a valve
+            and the failed edge is not in OR, or if all its remaining
+            predecessors in OR are broken. Valves are closed, and stop the
+            propagation.
+        """
+
+        removed = set()
+        broken_preds = Counter()
+
+        for u, v in edges:
+            if v in removed:
+                continue
+
+            if self.D[v] in self.valv:
+                if self.status[v] == "1":
+                    self.newstatus[v] = "0"
+                continue
+
+            if (self.condition[(u, v)] == "OR" and
+                broken_preds[v] < self.in_degree(v)):
+                continue
+
+            self.broken = set()
+            self.rm_nodes(v, removed=removed, broken_preds=broken_preds)
+            removed |= self.broken
+
+        self.broken = removed
+
+        return removed
+
+    def cascade_initialization(self):
+        """
+
+        Initialization of the vectorized propagation of the perturbation.
+        The successors of the nodes are stored in CSR (Compressed Sparse Row)
+        format, together with the indegree of the nodes and the masks of the
+        valves and of the nodes whose predecessors are in OR.
+        The conversion between the labels (ids) in the graph and the
+        array indices (and viceversa) is also exploited.
+
+        :return: row pointers and column indices of the adjacency matrix,
+            indegree, valve mask and OR mask of the nodes
+        :rtype: tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray,
+            numpy.ndarray, numpy.ndarray)
+        """
+
+        self.ids = dict(enumerate(self))
+        self.ids_reversed = { value: key for key, value in self.ids.items() }
+
+        edges = list(self.edges)
+        rows = [self.ids_reversed[u] for u, v in edges]
+        cols = [self.ids_reversed[v] for u, v in edges]
+        adjacency = csr_matrix((np.ones(len(edges), dtype=bool), (rows, cols)),
+            shape=(len(self), len(self)))
+
+        in_degree = np.bincount(adjacency.indices, minlength=len(self))
+        valve = np.array([self.D[n] in self.valv for n in self], dtype=bool)
+        OR = np.array([
+            list({ self.condition[(p, n)] for p in self.predecessors(n) }
+                or { "SINGLE" })[0] == "OR" for n in self ], dtype=bool)
+
+        return adjacency.indptr, adjacency.indices, in_degree, valve, OR
+
+    @staticmethod
+    def cascade_kernel(indptr, indices, in_degree, valve, OR, seeds):
+        """
+
+        Propagate the perturbation frontier by frontier: at each step, the
+        successors of the nodes broken in the previous step are reached.
+        A reached node breaks if it is not a valve and, in case its
+        predecessors are in OR, if all of them are broken.
+
+        :param numpy.ndarray indptr: row pointers of the adjacency matrix
+        :param numpy.ndarray indices: column indices of the adjacency matrix
+        :param numpy.ndarray in_degree: indegree of the nodes
+        :param numpy.ndarray valve: True for valves
+        :param numpy.ndarray OR: True for nodes whose predecessors are in OR
+        :param numpy.ndarray seeds: indices of the nodes to remove
+
+        :return: masks of the broken nodes and of the reached nodes
+        :rtype: tuple(numpy.ndarray, numpy.ndarray)
+        """
+
+        broken = np.zeros(len(in_degree), dtype=bool)
+        broken[seeds] = True
+        reached = broken.copy()
+        broken_preds = np.zeros(len(in_degree), dtype=np.int64)
+        frontier = np.flatnonzero(broken)
+
+        while frontier.size:
+            ends = indptr[frontier + 1]
+            lengths = ends - indptr[frontier]
+            succ = indices[np.repeat(ends - np.cumsum(lengths), lengths) +
+                np.arange(lengths.sum())]
+
+            succ, hits = np.unique(succ, return_counts=True)
+            broken_preds[succ] += hits
+            reached[succ] = True
+
+            frontier = succ[~broken[succ] & ~valve[succ] &
+                (~OR[succ] | (broken_preds[succ] == in_degree[succ]))]
+            broken[frontier] = True
+
+        return broken, reached
+
+    def propagate_perturbation(self, nodes):
+        """
+
+        Propagate the perturbation from one or more nodes at once, with
+        array operations on the CSR representation of the graph.
+        Broken nodes are added to self.broken, and reached valves are closed.
+
+        :param list nodes: ids of the nodes to remove
+
+        :return: the broken nodes
+        :rtype: set
+
+        .. note:: The nodes to remove are always broken. The perturbation
+            breaks the nodes whose predecessors are in AND (or which have a
+            single predecessor) as soon as one predecessor is broken, and the
+            nodes whose predecessors are in OR when all of them are broken.
+            Valves stop the propagation. Differently from rm_nodes, the
+            result does not depend on the order in which nodes are visited.
+        """
+
+        indptr, indices, in_degree, valve, OR = self.cascade_initialization()
+        seeds = [self.ids_reversed[n] for n in nodes]
+
+        broken, reached = self.cascade_kernel(indptr, indices, in_degree,
+            valve, OR, seeds)
+
+        for i in np.flatnonzero(reached & valve):
+            if self.status[self.ids[i]] == "1":
+                self.newstatus[self.ids[i]] = "0"
+
+        self.broken.update(self.ids[i] for i in np.flatnonzero(broken))
+        logging.debug("broken: %d nodes", len(self.broken))
+
+        return self.broken
+
+    @staticmethod
+    def bitmask_kernel(bits, pred_layers, OR=None):
+        """
+
+        Combine, for every node, the bitmasks of its predecessors:
+        bitwise OR for all the nodes, or bitwise AND for the nodes
+        whose predecessors are in OR, if their mask is given.
+
+        :param numpy.ndarray bits: bitmasks of the nodes, one row per node
+        :param list pred_layers: for k = 0, 1, ..., the nodes with more
+            than k predecessors and their k-th predecessor
+        :param OR: True for nodes whose predecessors are in OR
+        :type OR: numpy.ndarray, optional
+
+        :return: the combined bitmasks, zero for nodes without predecessors
+        :rtype: numpy.ndarray
+        """
+
+        combined = np.zeros_like(bits)
+        for nodes, preds in pred_layers:
+            combined[nodes] |= bits[preds]
+
+        if OR is not None and pred_layers:
+            nodes, preds = pred_layers[0]
+            nodes, preds = nodes[OR[nodes]], preds[OR[nodes]]
+            combined[nodes] = bits[preds]
+            for nodes, preds in pred_layers[1:]:
+                combined[nodes[OR[nodes]]] &= bits[preds[OR[nodes]]]
+
+        return combined
+
+    @staticmethod
+    def popcount(bits):
+        """
+
+        Number of bits set in each row of an array of bitmasks.
+
+        :param numpy.ndarray bits: bitmasks, one row per element
+
+        :return: the number of bits set in each row
+        :rtype: numpy.ndarray
+        """
+
+        return np.unpackbits(
+            np.ascontiguousarray(bits).view(np.uint8), axis=-1).sum(axis=-1)
+
+    def monte_carlo_perturbation(self, multi_areas, failure_probability,
+        samples=1024, seed=None):
+        """
+
+        Monte Carlo simulation of a probabilistic perturbation in one or
+        multiple areas: in every sample, each node in the areas fails with
+        the given probability, unless it is perturbation resistant.
+        Samples are propagated 64 at a time, as the bits of one uint64
+        bitmask per node, following the rules of propagate_perturbation.
+        Nodes' "failure_probability" attribute is evaluated.
+
+        :param list multi_areas: area(s) in which the perturbing event
+            may occur
+        :param failure_probability: probability of failure of the nodes in
+            the areas, the same for all the nodes or one for each node id
+        :type failure_probability: float or dict
+        :param int samples: number of samples, rounded up to a multiple of 64
+        :param int seed: seed of the random sampling of the failures,
+            default to None
+
+        :return: failure probability of each node, and probability that
+            each (SOURCE, USER) pair of services is disconnected
+        :rtype: tuple(dict, dict)
+
+        .. note:: The graph is not modified: in every sample, SOURCE and
+            USER nodes are disconnected if no path between them avoids
+            the broken nodes.
+        """
+
+        indptr, indices, in_degree, valve, OR = self.cascade_initialization()
+        n = len(self)
+        words = -(-samples // 64)
+        samples = 64 * words
+
+        # edges sorted by target node, split by rank among the predecessors
+        order = np.argsort(indices, kind='stable')
+        targets = indices[order]
+        pred_sources = np.repeat(np.arange(n), np.diff(indptr))[order]
+        rank = np.arange(len(targets)) - (np.cumsum(in_degree) -
+            in_degree)[targets]
+        pred_layers = [ (targets[rank == k], pred_sources[rank == k])
+            for k in range(in_degree.max(initial=0)) ]
+
+        vulnerable = [node for node in self if self.area.get(node) in
+            multi_areas and self.FR.get(node) != "1"]
+        if isinstance(failure_probability, dict):
+            probabilities = [failure_probability[node] for node in vulnerable]
         else:
-            pred = list(self.predecessors(node))
-            logging.debug("predecessors: %s", pred)
-            cond = set()
-            count = 0
-            if pred:
-                for p in pred:
-                    cond.add(self.condition[(p, node)])
-                    if any(p in x for x in self.broken):
-                        count = count + 1
-            else:
-                cond.add("SINGLE")
+            probabilities = [failure_probability] * len(vulnerable)
+
+        failures = np.random.RandomState(seed).random_sample(
+            (len(vulnerable), samples)) < np.reshape(probabilities, (-1, 1))
+        seeds = np.zeros((n, words), dtype=np.uint64)
+        seeds[[self.ids_reversed[node] for node in vulnerable]] = np.packbits(
+            failures, axis=1, bitorder='little').view(np.uint64)
+
+        broken = seeds
+        while True:
+            incoming = self.bitmask_kernel(broken, pred_layers, OR)
+            incoming[valve] = 0
+            new_broken = seeds | incoming
+            if np.array_equal(new_broken, broken):
+                break
+            broken = new_broken
 
-            if list(cond)[0] != "OR":
-                self.broken.append((node, "NULL"))
-                logging.debug("broken2: %s", self.broken)
-            else:
+        node_probability = dict(zip(self, self.popcount(broken) / samples))
+        nx.set_node_attributes(self, node_probability,
+            name="failure_probability")
 
-                if len(visited) == 1:
-                    self.broken.append((node, "NULL"))
-                    logging.debug("broken1: %s", self.broken)
+        marks = { value: key for key, value in reversed(list(self.Mark.items())) }
+        alive = ~broken
+        pair_probability = {}
+        for ii in self.services_SOURCE:
+            reached = np.zeros((n, words), dtype=np.uint64)
+            if marks.get(ii) in self:
+                source = self.ids_reversed[marks[ii]]
+                reached[source] = alive[source]
+                while True:
+                    new_reached = reached | (alive & self.bitmask_kernel(
+                        reached, pred_layers))
+                    if np.array_equal(new_reached, reached):
+                        break
+                    reached = new_reached
+
+            for jj in self.services_USER:
+                if marks.get(jj) in self:
+                    connected = self.popcount(
+                        reached[self.ids_reversed[marks[jj]]])
                 else:
-                    if (len(pred) - count) == 0:
-                        self.broken.append((node, "NULL"))
-                    else:
-                        return 0
+                    connected = 0
+                pair_probability[(ii, jj)] = 1 - connected / samples
+
+        return node_probability, pair_probability
+
+    def closure_index(self):
+        """
+
+        Index of the cascade closure ("blast radius") of the nodes, that is
+        the set of nodes broken by their failure, according to the rules
+        of propagate_perturbation.
+        Nodes are numbered in depth first search postorder of the
+        condensation of the graph, so that the nodes reached from a node
+        mostly follow each other, and closures are stored as runs of
+        consecutive positions (see union_runs).
+        Closures are computed in this (reverse topological) order as the
+        union of the closures of the successors that break, plus the
+        closures of the nodes fed in OR whose predecessors are all broken.
+        Nodes on cycles are propagated on demand with cascade_kernel.
+
+        .. note:: Together with the closure, every node stores the nodes
+            fed in OR which have some, but not all, predecessors in the
+            closure: these are the only candidates to break when closures
+            are merged.
+        """
+
+        cascade = self.cascade_initialization()
+        indptr, indices, in_degree, valve, OR = cascade
+        condensed = nx.condensation(self)
+        postorder = list(nx.dfs_postorder_nodes(condensed))
+
+        self.closure_order = [ node for c in postorder
+            for node in condensed.nodes[c]['members'] ]
+        self.closure_position = { node: k
+            for k, node in enumerate(self.closure_order) }
+        self.closure_cascade = cascade
+        self.closure_positions = np.array(
+            [self.closure_position[self.ids[i]] for i in range(len(self))],
+            dtype=np.int64)
+        self.closures = {}
+
+        for c in postorder:
+            members = condensed.nodes[c]['members']
+            if len(members) > 1:
+                continue
+            node, = members
+            if self.has_edge(node, node):
+                continue
+
+            position = self.closure_position[node]
+            runs = [((position, position + 1),)]
+            frontier = set()
+            for succ in self[node]:
+                if valve[self.ids_reversed[succ]]:
+                    continue
+                if OR[self.ids_reversed[succ]]:
+                    frontier.add(succ)
+                else:
+                    succ_runs, succ_frontier = self.node_closure(succ)
+                    runs.append(succ_runs)
+                    frontier |= succ_frontier
 
-        for next in set(self[node]) - visited:
-            self.rm_nodes(next, visited)
+            self.closures[node] = self.merge_closures(self.union_runs(*runs),
+                frontier)
 
-        return visited
+    @staticmethod
+    def union_runs(*runs):
+        """
+
+        Union of sets of positions stored as runs, that is sorted tuples of
+        disjoint (start, stop) ranges of consecutive positions.
+
+        :param tuple runs: the sets of positions, as runs
+
+        :return: the union of the sets, as runs
+        :rtype: tuple
+        """
+
+        union = []
+        for start, stop in sorted(chain.from_iterable(runs)):
+            if union and start <= union[-1][1]:
+                if stop > union[-1][1]:
+                    union[-1] = (union[-1][0], stop)
+            else:
+                union.append((start, stop))
+
+        return tuple(union)
+
+    @staticmethod
+    def runs_contain(runs, position):
+        """
+
+        Check whether a set of positions stored as runs (see union_runs)
+        contains a position.
+
+        :param tuple runs: the set of positions, as runs
+        :param int position: the position
+
+        :return: True if the position is in one of the runs
+        :rtype: bool
+        """
+
+        i = bisect_right(runs, (position, np.inf)) - 1
+        return i >= 0 and position < runs[i][1]
+
+    def node_closure(self, node):
+        """
+
+        Cascade closure of a node, taken from the index or, for nodes on
+        cycles, computed with cascade_kernel and added to the index.
+
+        :param str node: the id of the node
+
+        :return: the closure positions, as runs (see union_runs), and the
+            nodes fed in OR which have some, but not all, predecessors in
+            the closure
+        :rtype: tuple(tuple, set)
+        """
+
+        if node not in self.closures:
+            indptr, indices, in_degree, valve, OR = self.closure_cascade
+            broken, reached = self.cascade_kernel(indptr, indices, in_degree,
+                valve, OR, [self.ids_reversed[node]])
+
+            positions = np.sort(self.closure_positions[broken])
+            splits = np.flatnonzero(np.diff(positions) != 1) + 1
+            runs = tuple((int(run[0]), int(run[-1]) + 1)
+                for run in np.split(positions, splits) if len(run))
+            frontier = { self.ids[i]
+                for i in np.flatnonzero(reached & OR & ~valve & ~broken) }
+
+            self.closures[node] = (runs, frontier)
+
+        return self.closures[node]
+
+    def merge_closures(self, runs, frontier):
+        """
+
+        Complete the union of some cascade closures with the nodes fed in
+        OR whose predecessors are all in the union, and with their closures,
+        until no more nodes break.
+
+        :param tuple runs: union of the closure positions, as runs
+        :param set frontier: union of the nodes fed in OR which have some
+            predecessors in the closures
+
+        :return: the closure positions, as runs, and the nodes fed in OR
+            which have some, but not all, predecessors in the closure
+        :rtype: tuple(tuple, set)
+        """
+
+        position = self.closure_position
+        frontier = { n for n in frontier
+            if not self.runs_contain(runs, position[n]) }
+
+        while True:
+            broken = [ n for n in frontier if all(
+                self.runs_contain(runs, position[p])
+                for p in self.predecessors(n)) ]
+            if not broken:
+                break
+            closures = [ self.node_closure(n) for n in broken ]
+            runs = self.union_runs(runs,
+                *[ n_runs for n_runs, n_frontier in closures ])
+            for n_runs, n_frontier in closures:
+                frontier |= n_frontier
+            frontier = { n for n in frontier
+                if not self.runs_contain(runs, position[n]) }
+
+        return runs, frontier
+
+    def blast_radius(self, nodes):
+        """
+
+        Nodes broken by the failure of one or more nodes, according to the
+        rules of propagate_perturbation, taken from the closure index:
+        the closure of a single node is looked up, and the closures of
+        several nodes are merged.
+
+        :param list nodes: ids of the failing nodes
+
+        :return: the broken nodes
+        :rtype: set
+
+        .. note:: The index is built the first time it is needed, and
+            built again after the graph is changed (see compute_metrics).
+        """
+
+        self.compute_metrics("closure_index")
+
+        closures = [ self.node_closure(node) for node in nodes ]
+        runs = self.union_runs(*[ runs for runs, frontier in closures ])
+        frontier = set().union(*[ frontier for runs, frontier in closures ])
+        if len(nodes) > 1:
+            runs, frontier = self.merge_closures(runs, frontier)
+
+        return { node for start, stop in runs
+            for node in self.closure_order[start:stop] }
+
+    def contingency_initialization(self):
+        """
+
+        Initialization of the contingency analysis of the intact graph.
+        Distances are computed with the Dijkstra algorithm on the CSR
+        representation of the graph, together with the efficiency of each
+        pair of nodes and the nodes that the shortest paths from each
+        source go through.
+
+        :return: weighted adjacency matrix, distance matrix, predecessors
+            matrix (-9999 where there is no path), efficiency matrix and its
+            row sums, matrix whose (s, x) entry is True if the shortest
+            paths from source s go through node x, indices of the SOURCE
+            and USER nodes of the service pairs (one pair per row)
+        :rtype: tuple
+        """
+
+        csr = self.csr_initialization()
+        dist, pred = dijkstra(csr, directed=True, return_predecessors=True)
+        eff = self.compute_efficiency(dist)
+
+        uses = np.zeros(dist.shape, dtype=bool)
+        sources, targets = np.nonzero(pred >= 0)
+        uses[sources, pred[sources, targets]] = True
+
+        pairs = np.array([[self.ids_reversed[i], self.ids_reversed[j]]
+            for ii, jj, i, j in self.service_pairs()], dtype=int)
+
+        return (csr, dist, pred, eff, eff.sum(axis=1), uses,
+            pairs.reshape(-1, 2))
+
+    @staticmethod
+    def contingency_kernel(csr, dist, eff, eff_rows, uses, pairs, broken):
+        """
+
+        Effects of the perturbation that breaks some nodes of the intact
+        graph. Shortest paths are computed again only from the sources
+        whose shortest paths go through the broken nodes: from the other
+        sources, the distances to the remaining nodes do not change.
+
+        :param csr: weighted adjacency matrix of the intact graph
+        :type csr: scipy.sparse.csr_matrix
+        :param numpy.ndarray dist: distance matrix of the intact graph
+        :param numpy.ndarray eff: efficiency matrix of the intact graph
+        :param numpy.ndarray eff_rows: row sums of the efficiency matrix
+        :param numpy.ndarray uses: matrix whose (s, x) entry is True if the
+            shortest paths from source s go through node x
+        :param numpy.ndarray pairs: indices of the SOURCE and USER nodes of
+            the service pairs, one pair per row
+        :param numpy.ndarray broken: mask of the broken nodes
+
+        :return: sum of the efficiencies of all the pairs of nodes of the
+            perturbed graph, and number of service pairs connected in the
+            intact graph but not in the perturbed one
+        :rtype: tuple(float, int)
+        """
+
+        alive = ~broken
+        affected = alive & uses[:, broken].any(axis=1)
+        unaffected = alive & ~affected
+
+        sum_eff = (eff_rows[unaffected] -
+            eff[np.ix_(unaffected, broken)].sum(axis=1)).sum()
+
+        source, target = pairs[:, 0], pairs[:, 1]
+        connected = np.isfinite(dist[source, target])
+        still_connected = connected & alive[source] & alive[target]
+
+        if affected.any():
+            index = np.flatnonzero(alive)
+            position = np.full(len(alive), -1)
+            position[index] = np.arange(len(index))
+            row = np.full(len(alive), -1)
+            row[affected] = np.arange(np.count_nonzero(affected))
+
+            new_dist = dijkstra(csr[index][:, index], directed=True,
+                indices=position[affected])
+            sum_eff += GeneralGraph.compute_efficiency(new_dist).sum()
+
+            check = still_connected & affected[source]
+            still_connected[check] = np.isfinite(
+                new_dist[row[source[check]], position[target[check]]])
+
+        return float(sum_eff), int(np.count_nonzero(
+            connected & ~still_connected))
+
+    def broken_nodes(self, nodes):
+        """
+
+        Nodes broken by the perturbation of one or more nodes, propagated
+        as in delete_a_node and simulate_multi_area_perturbation, without
+        modifying the graph.
+
+        :param list nodes: ids of the nodes to perturb, in order
+
+        :return: the broken nodes
+        :rtype: set
+        """
+
+        newstatus = self.newstatus
+        self.newstatus = dict(newstatus)
+
+        self.broken = set()
+        if self.vectorized_cascade:
+            self.propagate_perturbation(nodes)
+        else:
+            self.rm_multiple_nodes(nodes)
+        broken = self.broken
+
+        self.newstatus = newstatus
+        self.broken = set()
+
+        return broken
+
+    def contingency_record(self, nodes, init):
+        """
+
+        Propagate the perturbation from one or more nodes without modifying
+        the graph, and evaluate its effects with contingency_kernel.
+
+        :param nodes: id of the node, or tuple of ids of the nodes,
+            to perturb
+        :type nodes: str or tuple
+        :param tuple init: output of contingency_initialization
+
+        :return: dictionary with the perturbed node (or nodes), the number
+            of broken nodes, the drop in the average global efficiency and
+            the number of service pairs lost
+        :rtype: dict
+        """
+
+        csr, dist, pred, eff, eff_rows, uses, pairs = init
+        n = len(self)
+        n_pairs = n * (n - 1) if n > 1 else 1
+
+        broken_nodes = self.broken_nodes(
+            list(nodes) if isinstance(nodes, tuple) else [nodes])
+        broken = np.zeros(n, dtype=bool)
+        broken[[self.ids_reversed[b] for b in broken_nodes]] = True
+        sum_eff, services_lost = self.contingency_kernel(csr, dist, eff,
+            eff_rows, uses, pairs, broken)
+
+        return {
+            'node': nodes,
+            'broken': len(broken_nodes),
+            'global_efficiency_drop': float(
+                (eff_rows.sum() - sum_eff) / n_pairs),
+            'services_lost': services_lost
+        }
+
+    def contingency_records(self, nodes, init):
+        """
+
+        Evaluate the perturbation of each node, one at a time
+        (see contingency_record).
+
+        :param list nodes: ids of the nodes to perturb
+        :param tuple init: output of contingency_initialization
+
+        :return: the records of the perturbations
+        :rtype: list
+        """
+
+        return [self.contingency_record(node, init) for node in nodes]
+
+    def contingency_iteration_parallel(self, out_q, nodes, init):
+        """
+
+        Parallel evaluation of the single node perturbations.
+
+        :param multiprocessing.queues.Queue out_q: multiprocessing queue
+        :param list nodes: ids of the nodes to perturb
+        :param tuple init: output of contingency_initialization
+        """
+
+        out_q.put(self.contingency_records(nodes, init))
+
+    def contingency_sweep(self, nodes=None):
+        """
+
+        N-1 contingency analysis: the perturbation of each single node is
+        propagated, and its effects on the intact graph are evaluated,
+        without modifying the graph and without writing any file.
+        For big graphs go parallel (number of processes equals the total
+        number of available CPUs), for small graphs go serial.
+
+        :param nodes: ids of the nodes to perturb, default to all the nodes
+        :type nodes: list, optional
+
+        :return: for each node, a dictionary with the id of the node
+            ('node'), the number of broken nodes ('broken'), the drop in the
+            average global efficiency ('global_efficiency_drop') and the
+            number of SOURCE-USER service pairs lost ('services_lost'),
+            sorted from the most to the least critical node
+        :rtype: list
+
+        .. note:: The average global efficiency of the perturbed graph is
+            normalized by the number of pairs of nodes of the intact graph,
+            as if the broken nodes were still there but unreachable, so
+            that the drop measures the efficiency lost by the whole plant
+            (and it is never negative).
+            Nodes are ranked by efficiency drop, then by services lost and
+            by number of broken nodes; ties keep the order of the nodes.
+        """
+
+        nodes = list(self) if nodes is None else list(nodes)
+        init = self.contingency_initialization()
+
+        if len(self) > 10000:
+            out_q = Queue()
+            node_chunks = self.chunk_it(nodes,
+                getattr(self, "num", mp.cpu_count()))
+
+            processes = [
+                mp.Process( target=self.contingency_iteration_parallel,
+                args=( out_q, node_chunks[p], init ))
+                for p in range(len(node_chunks)) ]
+
+            for proc in processes:
+                proc.start()
+
+            records = list(chain.from_iterable(
+                out_q.get() for proc in processes))
+
+            for proc in processes:
+                proc.join()
+        else:
+            records = self.contingency_records(nodes, init)
+
+        return self.rank_contingencies(records, nodes)
+
+    @staticmethod
+    def path_efficiency_kernel(pred, eff):
+        """
+
+        Efficiency of the pairs of nodes whose shortest path goes through
+        each node. For each source, the efficiencies of the targets are
+        summed up along its shortest path tree, from the leaves to the
+        root, one depth at a time; the depth of the targets in the tree
+        is computed by pointer jumping.
+
+        :param numpy.ndarray pred: predecessors matrix, as returned by
+            scipy.sparse.csgraph.dijkstra (negative for no predecessor)
+        :param numpy.ndarray eff: efficiency matrix
+
+        :return: for each node, the sum of the efficiencies of the pairs
+            whose shortest path goes through it, as intermediate node
+        :rtype: numpy.ndarray
+        """
+
+        n = len(eff)
+        rows = np.arange(n)[:, None]
+        parent = np.where(pred >= 0, pred, -1)
+
+        depth = (parent >= 0).astype(np.int64)
+        jump = parent.copy()
+        while (jump >= 0).any():
+            valid = jump >= 0
+            ancestor = np.where(valid, jump, 0)
+            depth = depth + np.where(valid, depth[rows, ancestor], 0)
+            jump = np.where(valid, jump[rows, ancestor], -1)
+
+        subtree = eff.copy()
+        sources, targets = np.nonzero(depth > 0)
+        levels = depth[sources, targets]
+        order = np.argsort(-levels, kind='stable')
+        sources, targets, levels = sources[order], targets[order], levels[order]
+        bounds = np.flatnonzero(np.diff(levels)) + 1
+        for s, t in zip(np.split(sources, bounds), np.split(targets, bounds)):
+            np.add.at(subtree, (s, parent[s, t]), subtree[s, t])
+
+        through = (subtree - eff).sum(axis=0)
+        through -= (subtree - eff)[np.arange(n), np.arange(n)]
+
+        return through
+
+    def contingency_bounds(self, init, nodes):
+        """
+
+        Upper bounds of the drop in the average global efficiency caused
+        by the perturbation of each node (see contingency_sweep). The
+        perturbation of a node can only lose the efficiency of the pairs
+        which start from, end in, or whose shortest path goes through a
+        node in its cascade closure (see closure_index): the bound is the
+        sum of the efficiencies of such pairs.
+
+        :param tuple init: output of contingency_initialization
+        :param list nodes: ids of the nodes
+
+        :return: the upper bounds, in the order of the nodes
+        :rtype: numpy.ndarray
+        """
+
+        csr, dist, pred, eff, eff_rows, uses, pairs = init
+        n = len(self)
+        n_pairs = n * (n - 1) if n > 1 else 1
+        weights = (eff_rows + eff.sum(axis=0) +
+            self.path_efficiency_kernel(pred, eff)) / n_pairs
+
+        self.compute_metrics("closure_index")
+        weights = weights[[self.ids_reversed[node]
+            for node in self.closure_order]]
+
+        cumulative = np.concatenate(([0.], np.cumsum(weights)))
+
+        upper_bounds = []
+        for node in nodes:
+            runs = self.node_closure(node)[0]
+            upper_bounds.append(sum(cumulative[stop] - cumulative[start]
+                for start, stop in runs))
+
+        return np.array(upper_bounds)
+
+    def most_critical(self, k=10, nodes=None):
+        """
+
+        The k most critical nodes, that is the first k records of
+        contingency_sweep, found branch-and-bound style: nodes are
+        evaluated in decreasing order of the upper bound of their
+        efficiency drop (see contingency_bounds), until no other node can
+        enter the top k.
+
+        :param int k: number of nodes to return
+        :param nodes: ids of the candidate nodes, default to all the nodes
+        :type nodes: list, optional
+
+        :return: the records of the k most critical nodes (see
+            contingency_sweep), sorted from the most to the least critical
+        :rtype: list
+        """
+
+        nodes = list(self) if nodes is None else list(nodes)
+        position = { node: i for i, node in enumerate(nodes) }
+        init = self.contingency_initialization()
+        upper_bounds = self.contingency_bounds(init, nodes)
+
+        heap = []
+        evaluated = 0
+        for i in np.argsort(-upper_bounds, kind='stable'):
+            # a small tolerance covers the rounding of the bounds
+            if (len(heap) == k and
+                upper_bounds[i] * (1 + 1e-9) < heap[0][0][0]):
+                break
+
+            evaluated += 1
+            record = self.contingency_record(nodes[i], init)
+            item = (self.contingency_priority(record, position), record)
+            if len(heap) < k:
+                heappush(heap, item)
+            elif item[0] > heap[0][0]:
+                heappushpop(heap, item)
+
+        logging.debug("most critical: %d of %d nodes evaluated", evaluated,
+            len(nodes))
+
+        return self.rank_contingencies([record for _, record in heap], nodes)
+
+    @staticmethod
+    def contingency_priority(record, position):
+        """
+
+        Priority of a record of the contingency analysis: the higher the
+        priority, the more critical the perturbation. Perturbations are
+        compared by efficiency drop, then by services lost and by number
+        of broken nodes, and finally by the position of the perturbed nodes.
+
+        :param dict record: record of the contingency analysis
+        :param dict position: position of each node, used to break ties
+
+        :return: the priority
+        :rtype: tuple
+        """
+
+        nodes = record['node']
+        if not isinstance(nodes, tuple):
+            nodes = (nodes, )
+
+        return (record['global_efficiency_drop'], record['services_lost'],
+            record['broken'], tuple(-position[n] for n in nodes))
+
+    @staticmethod
+    def rank_contingencies(records, nodes):
+        """
+
+        Sort the records of the contingency analysis from the most to the
+        least critical.
+
+        :param list records: records of the contingency analysis
+        :param list nodes: perturbed nodes in their original order,
+            used to break ties
+
+        :return: the sorted records
+        :rtype: list
+        """
+
+        position = { node: k for k, node in enumerate(nodes) }
+
+        return sorted(records, reverse=True,
+            key=lambda r: GeneralGraph.contingency_priority(r, position))
+
+    def undominated_combinations(self, nodes, k, closures=None, first=None):
+        """
+
+        Combinations of k nodes in which no node is broken by the
+        perturbation of another one: such combinations are dominated by
+        smaller ones, and they are pruned as soon as two dominated nodes
+        are combined.
+
+        :param list nodes: ids of the candidate nodes
+        :param int k: number of nodes in each combination
+        :param closures: nodes broken by the perturbation of each candidate
+            node; default to the cascade closures of the closure index
+            (see closure_index), which follow the rules of
+            propagate_perturbation
+        :type closures: dict, optional
+        :param first: positions, among the candidate nodes, of the nodes
+            the combinations start with; default to all the positions
+        :type first: list, optional
+
+        :return: the combinations, in lexicographic order of the positions
+            of the nodes
+        :rtype: generator
+        """
+
+        if closures is None:
+            self.compute_metrics("closure_index")
+            position = self.closure_position
+            runs = { n: self.node_closure(n)[0] for n in nodes }
+
+            def breaks(p, n):
+                return self.runs_contain(runs[p], position[n])
+        else:
+            def breaks(p, n):
+                return n in closures[p]
+
+        def dominated(n, prefix):
+            return any(breaks(p, n) or breaks(n, p) for p in prefix)
+
+        first = range(len(nodes)) if first is None else first
+        stack = [ ((nodes[i], ), i + 1) for i in reversed(first) ]
+        while stack:
+            prefix, start = stack.pop()
+            if len(prefix) == k:
+                yield prefix
+                continue
+            for i in reversed(range(start, len(nodes))):
+                if not dominated(nodes[i], prefix):
+                    stack.append((prefix + (nodes[i], ), i + 1))
+
+    def contingency_top_records(self, combinations, init, position, top,
+        deadline=None):
+        """
+
+        Evaluate the perturbation of combinations of nodes (see
+        contingency_record), keeping only the most critical ones in a
+        bounded heap.
+
+        :param combinations: tuples of ids of the nodes to perturb
+        :type combinations: iterable
+        :param tuple init: output of contingency_initialization
+        :param dict position: position of each node, used to break ties
+        :param int top: number of records to keep
+        :param deadline: time (as returned by time.time()) after which
+            no more combinations are evaluated
+        :type deadline: float, optional
+
+        :return: the most critical records, in no particular order
+        :rtype: list
+        """
+
+        heap = []
+        for nodes in combinations:
+            if deadline is not None and time.time() > deadline:
+                break
+
+            record = self.contingency_record(nodes, init)
+            item = (self.contingency_priority(record, position), record)
+            if len(heap) < top:
+                heappush(heap, item)
+            elif item[0] > heap[0][0]:
+                heappushpop(heap, item)
+
+        return [record for priority, record in heap]
+
+    def contingency_top_iteration_parallel(self, out_q, nodes, k, closures,
+        first, init, position, top, deadline):
+        """
+
+        Parallel evaluation of the perturbation of the combinations of
+        nodes starting with some of the nodes.
+
+        :param multiprocessing.queues.Queue out_q: multiprocessing queue
+        :param list nodes: ids of the candidate nodes
+        :param int k: number of nodes in each combination
+        :param closures: nodes broken by the perturbation of each candidate
+            node, see undominated_combinations
+        :type closures: dict or None
+        :param list first: positions, among the candidate nodes, of the
+            nodes the combinations start with
+        :param tuple init: output of contingency_initialization
+        :param dict position: position of each node, used to break ties
+        :param int top: number of records to keep
+        :param deadline: time after which no more combinations are evaluated
+        :type deadline: float or None
+        """
+
+        out_q.put(self.contingency_top_records(
+            self.undominated_combinations(nodes, k, closures, first), init,
+            position, top, deadline))
+
+    def contingency_enumeration(self, k=2, nodes=None, top=10,
+        time_budget=None):
+        """
+
+        N-k contingency analysis: the simultaneous perturbation of each
+        combination of k nodes is propagated (as in
+        simulate_multi_area_perturbation), and its effects on the intact
+        graph are evaluated as in contingency_sweep, without modifying
+        the graph and without writing any file.
+        For big graphs go parallel (number of processes equals the total
+        number of available CPUs), for small graphs go serial.
+
+        :param int k: number of nodes perturbed at the same time
+        :param nodes: ids of the candidate nodes, default to all the nodes
+        :type nodes: list, optional
+        :param int top: number of most critical combinations to return
+        :param time_budget: seconds after which no more combinations are
+            evaluated, default to no limit
+        :type time_budget: float, optional
+
+        :return: the records (see contingency_sweep) of the most critical
+            combinations, whose 'node' is the tuple of the perturbed nodes,
+            sorted from the most to the least critical
+        :rtype: list
+
+        .. note:: Combinations in which a node is broken by the perturbation
+            of another one are skipped (see undominated_combinations).
+            When the time budget runs out, the most critical among the
+            combinations evaluated so far are returned.
+        """
+
+        start = time.time()
+        deadline = None if time_budget is None else start + time_budget
+
+        nodes = list(self) if nodes is None else list(nodes)
+        position = { node: i for i, node in enumerate(nodes) }
+        init = self.contingency_initialization()
+        # combinations are pruned with the rules of propagation used to
+        # evaluate them (see broken_nodes): the closure index follows the
+        # ones of propagate_perturbation
+        if self.vectorized_cascade:
+            self.compute_metrics("closure_index")
+            closures = None
+        else:
+            closures = { node: self.broken_nodes([node]) for node in nodes }
+
+        if len(self) > 10000:
+            num = getattr(self, "num", mp.cpu_count())
+            out_q = Queue()
+
+            # combinations are split by their first node, dealt in turn
+            # to the processes, since the first nodes start more of them
+            processes = [
+                mp.Process( target=self.contingency_top_iteration_parallel,
+                args=( out_q, nodes, k, closures,
+                list(range(p, len(nodes), num)), init, position, top,
+                deadline ))
+                for p in range(num) ]
+
+            for proc in processes:
+                proc.start()
+
+            records = list(chain.from_iterable(
+                out_q.get() for proc in processes))
+
+            for proc in processes:
+                proc.join()
+        else:
+            records = self.contingency_top_records(
+                self.undominated_combinations(nodes, k, closures), init,
+                position, top, deadline)
+
+        return self.rank_contingencies(records, nodes)[:top]
+
+    @staticmethod
+    def dominator_kernel(indptr, indices, pred_indptr, pred_indices, source):
+        """
+
+        Dominator tree of the nodes reachable from a source, with the
+        iterative algorithm of Cooper, Harvey and Kennedy: the immediate
+        dominators are refined in reverse postorder, intersecting the
+        dominators of the predecessors, until they do not change anymore.
+        A node d dominates a node v if every path from the source to v
+        goes through d.
+
+        :param numpy.ndarray indptr: index pointers of the successors
+        :param numpy.ndarray indices: successors of the nodes
+        :param numpy.ndarray pred_indptr: index pointers of the predecessors
+        :param numpy.ndarray pred_indices: predecessors of the nodes
+        :param int source: index of the source
+
+        :return: index of the immediate dominator of each node, equal to
+            the source for the source itself and -1 for unreachable nodes
+        :rtype: numpy.ndarray
+        """
+
+        n = len(indptr) - 1
+        indptr, indices = indptr.tolist(), indices.tolist()
+        pred_indptr, pred_indices = pred_indptr.tolist(), pred_indices.tolist()
+
+        postorder = []
+        visited = [False] * n
+        visited[source] = True
+        stack = [(source, indptr[source])]
+        while stack:
+            v, k = stack[-1]
+            if k < indptr[v + 1]:
+                stack[-1] = (v, k + 1)
+                w = indices[k]
+                if not visited[w]:
+                    visited[w] = True
+                    stack.append((w, indptr[w]))
+            else:
+                stack.pop()
+                postorder.append(v)
+
+        position = [-1] * n
+        for k, v in enumerate(postorder):
+            position[v] = k
+
+        idom = [-1] * n
+        idom[source] = source
+        changed = True
+        while changed:
+            changed = False
+            for v in reversed(postorder[:-1]):
+                new_idom = -1
+                for p in pred_indices[pred_indptr[v]:pred_indptr[v + 1]]:
+                    if idom[p] == -1:
+                        continue
+                    if new_idom == -1:
+                        new_idom = p
+                        continue
+                    while p != new_idom:
+                        while position[p] < position[new_idom]:
+                            p = idom[p]
+                        while position[new_idom] < position[p]:
+                            new_idom = idom[new_idom]
+                if idom[v] != new_idom:
+                    idom[v] = new_idom
+                    changed = True
+
+        return np.array(idom)
+
+    def single_points_of_failure(self):
+        """
+
+        Single points of failure of the SOURCE-USER services: for each pair
+        of SOURCE and USER nodes, the nodes whose removal cuts every path
+        from the SOURCE to the USER, found in the dominator tree of the
+        SOURCE (see dominator_kernel) on the CSR representation of the graph.
+
+        :return: for each connected pair of SOURCE and USER ids, the list of
+            the nodes that dominate the USER (SOURCE and USER excluded), from
+            the SOURCE to the USER; and, for each node, the number of pairs
+            it is a single point of failure for
+        :rtype: tuple(dict, dict)
+
+        .. note:: The analysis is purely topological: valves and the AND/OR
+            conditions of the nodes are not considered.
+        """
+
+        csr = self.csr_initialization()
+        csc = csr.tocsc()
+        pairs = self.service_pairs()
+
+        dominators = {}
+        counts = Counter()
+        for source in dict.fromkeys(i for ii, jj, i, j in pairs):
+            s = self.ids_reversed[source]
+            idom = self.dominator_kernel(csr.indptr, csr.indices,
+                csc.indptr, csc.indices, s)
+
+            for user in (j for ii, jj, i, j in pairs if i == source):
+                v = self.ids_reversed[user]
+                if v == s or idom[v] == -1:
+                    continue
+                chain_of_dominators = []
+                v = idom[v]
+                while v != s:
+                    chain_of_dominators.append(self.ids[v])
+                    v = idom[v]
+                dominators[(source, user)] = chain_of_dominators[::-1]
+                counts.update(chain_of_dominators)
+
+        return dominators, dict(counts)
 
     @staticmethod
     def merge_lists(l1, l2, key):
@@ -1167,7 +3542,7 @@ class GeneralGraph(nx.DiGraph):
             if item[key] in merged:
                 merged[item[key]].update(item)
             else:
-                merged[item[key]] = item
+                merged[item[key]] = dict(item)
         return [val for (_, val) in merged.items()]
 
     def update_areas(self, multi_areas):
@@ -1202,7 +3577,9 @@ class GeneralGraph(nx.DiGraph):
             else:
                 self.copy_of_self1.nodes[n]["Status_Area"] = "AVAILABLE"
 
-    def delete_a_node(self, node):
+    def delete_a_node(self, node, metrics=efficiency_metrics + (
+        "closeness_centrality", "betweenness_centrality",
+        "degree_centralities")):
         """
 
         Delete a node in the graph to simulate a perturbation to an element in
@@ -1211,61 +3588,130 @@ class GeneralGraph(nx.DiGraph):
         and "Status_Area" attributes are evaluated.
 
         :param str node: the id of the node to remove
+        :param metrics: names of the metrics to be computed, default to
+            efficiency measures and all the centrality measures
+        :type metrics: tuple, optional
         """
 
-        self.broken = [] #clear previous perturbation broken nodes
+        self.broken = set() #clear previous perturbation broken nodes
         if node in self.nodes():
 
-            self.check_before()
+            self.check_before(metrics)
 
-            self.closeness_centrality()
+            self.copy_of_self1 = self.structural_copy()
 
-            self.betweenness_centrality()
+            # from now on metrics describe the perturbed graph
+            self.invalidate_metrics()
 
-            self.indegree_centrality()
+            if self.vectorized_cascade:
+                self.propagate_perturbation([node])
+            else:
+                self.rm_nodes(node)
+
+            self.element_perturbation_to_file(metrics)
+
+        else:
+            print('The node is not in the graph')
+            print('Insert a valid node')
 
-            self.outdegree_centrality()
+    def delete_an_edge(self, u, v, metrics=efficiency_metrics + (
+        "closeness_centrality", "betweenness_centrality",
+        "degree_centralities")):
+        """
 
-            self.degree_centrality()
+        Delete an edge in the graph to simulate a perturbation to a pipe or
+        a cable in a plant and start to propagate the perturbation.
+        Nodes' "IntermediateStatus", "FinalStatus", "Mark_Status"
+        and "Status_Area" attributes are evaluated.
 
-            self.copy_of_self1 = copy.deepcopy(self)
+        :param str u: the id of the edge tail
+        :param str v: the id of the edge head
+        :param metrics: names of the metrics to be computed, default to
+            efficiency measures and all the centrality measures
+        :type metrics: tuple, optional
+        """
 
-            self.rm_nodes(node)
+        self.delete_edges([(u, v)], metrics)
 
-            self.bn = list(set(list(chain(*self.broken))))
+    def delete_edges(self, edges, metrics=efficiency_metrics + (
+        "closeness_centrality", "betweenness_centrality",
+        "degree_centralities")):
+        """
 
-            if "NULL" in self.bn:
-                self.bn.remove("NULL")
+        Delete several edges in the graph to simulate a perturbation to
+        pipes or cables in a plant and start to propagate the perturbation.
+        Nodes' "IntermediateStatus", "FinalStatus", "Mark_Status"
+        and "Status_Area" attributes are evaluated.
 
-            for n in self.bn:
-                self.remove_node(n)
+        :param list edges: (tail, head) pairs of the edges to remove
+        :param metrics: names of the metrics to be computed, default to
+            efficiency measures and all the centrality measures
+        :type metrics: tuple, optional
 
-            self.lst = []
+        .. note:: The shortest paths of the perturbed graph are updated
+            only from the sources whose shortest paths are affected by the
+            removed edges and by the broken nodes.
+        """
 
-            self.check_after()
+        self.broken = set() #clear previous perturbation broken nodes
+        if edges and all(self.has_edge(u, v) for u, v in edges):
 
-            self.service_paths_to_file("service_paths_element_perturbation.csv")
-            
-            self.update_status(self.newstatus, "IntermediateStatus", self.bn)
-          
-            self.update_status(self.finalstatus, "FinalStatus", self.bn)
+            self.check_before(metrics)
 
-            for n in self.copy_of_self1:
+            self.copy_of_self1 = self.structural_copy()
 
-                if n in self.bn:
-                    self.copy_of_self1.nodes[n]["Mark_Status"] = "NOT_ACTIVE"
-                else:
-                    self.copy_of_self1.nodes[n]["Mark_Status"] = "ACTIVE"
+            # from now on metrics describe the perturbed graph
+            self.invalidate_metrics()
 
-                self.copy_of_self1.nodes[n]["Status_Area"] = "AVAILABLE"
+            self.remove_edges_from(edges)
+            self.rm_edges(edges)
 
-            self.graph_characterization_to_file("element_perturbation.csv")
+            self.element_perturbation_to_file(metrics)
 
         else:
-            print('The node is not in the graph')
-            print('Insert a valid node')
+            print('The edge is not in the graph')
+            print('Insert a valid edge')
+
+    def element_perturbation_to_file(self, metrics):
+        """
 
-    def simulate_multi_area_perturbation(self, multi_areas):
+        Remove the nodes broken by the perturbation of an element, evaluate
+        the requested metrics of the perturbed graph and write the results
+        to file.
+        Nodes' "IntermediateStatus", "FinalStatus", "Mark_Status"
+        and "Status_Area" attributes are evaluated.
+
+        :param tuple metrics: names of the metrics to be computed
+        """
+
+        self.bn = list(self.broken)
+
+        self.remove_nodes_from(self.bn)
+
+        self.lst = []
+
+        self.check_after(metrics)
+
+        self.service_paths_to_file("service_paths_element_perturbation.csv")
+
+        self.update_status(self.newstatus, "IntermediateStatus", self.bn)
+
+        self.update_status(self.finalstatus, "FinalStatus", self.bn)
+
+        for n in self.copy_of_self1:
+
+            if n in self.bn:
+                self.copy_of_self1.nodes[n]["Mark_Status"] = "NOT_ACTIVE"
+            else:
+                self.copy_of_self1.nodes[n]["Mark_Status"] = "ACTIVE"
+
+            self.copy_of_self1.nodes[n]["Status_Area"] = "AVAILABLE"
+
+        self.graph_characterization_to_file("element_perturbation.csv")
+
+    def simulate_multi_area_perturbation(self, multi_areas,
+        metrics=efficiency_metrics + ("closeness_centrality",
+        "betweenness_centrality", "indegree_centrality")):
         """
 
         Simulate a perturbation in one or multiple areas.
@@ -1274,9 +3720,13 @@ class GeneralGraph(nx.DiGraph):
 
         :param list multi_areas: area(s) in which the perturbing event
             occurred
+        :param metrics: names of the metrics to be computed, default to
+            efficiency measures and closeness, betweenness and indegree
+            centrality measures
+        :type metrics: tuple, optional
         """
 
-        self.broken = [] #clear previous perturbation broken nodes
+        self.broken = set() #clear previous perturbation broken nodes
         self.nodes_in_area = []
 
         for area in multi_areas:
@@ -1291,11 +3741,11 @@ class GeneralGraph(nx.DiGraph):
                     if Area == area:
                         self.nodes_in_area.append(id)
 
-        self.check_before()
-        self.closeness_centrality()
-        self.betweenness_centrality()
-        self.indegree_centrality()
-        self.copy_of_self1 = copy.deepcopy(self)
+        self.check_before(metrics)
+        self.copy_of_self1 = self.structural_copy()
+
+        # from now on metrics describe the perturbed graph
+        self.invalidate_metrics()
 
         FR_nodes = []
 
@@ -1307,28 +3757,22 @@ class GeneralGraph(nx.DiGraph):
         FV_nodes_in_area = [x for x in FV_nodes_in_area if str(x) != 'nan']
 
         if (len(FV_nodes_in_area)) != 0:
-            for node in FV_nodes_in_area:
-                self.broken = []
-                if node in self.nodes():
-                    self.rm_nodes(node)
-                    self.bn = list(set(list(chain(*self.broken))))
-                    if "NULL" in self.bn:
-                        self.bn.remove("NULL")
-                    for n in self.bn:
-                        self.remove_node(n)
-
-                FV_nodes_in_area = list(set(FV_nodes_in_area) - set(self.bn))
+            if self.vectorized_cascade:
+                self.propagate_perturbation(FV_nodes_in_area)
+            else:
+                self.rm_multiple_nodes(FV_nodes_in_area)
 
-            FV_nodes_in_area = FV_nodes_in_area
+            self.bn = list(self.broken)
+            self.remove_nodes_from(self.bn)
 
             self.lst = []
 
-            self.check_after()
+            self.check_after(metrics)
 
         else:
             self.lst = []
 
-            self.check_after()
+            self.check_after(metrics)
 
         self.service_paths_to_file("service_paths_multi_area_perturbation.csv")
         
@@ -1394,11 +3838,25 @@ class GeneralGraph(nx.DiGraph):
 
         Write to file graph characterization
         after the perturbation.
+        The metrics printed are computed first, if they have not been
+        computed yet (see compute_metrics).
 
         :param str filename: output file name where to print the
             graph characterization
         """
 
+        # metrics printed for the intact graph are computed on its copy, if
+        # they have not been requested, and the ones of the perturbed graph
+        # are then evaluated against them
+        self.copy_of_self1.compute_metrics(*self.efficiency_metrics,
+            "closeness_centrality", "betweenness_centrality",
+            "indegree_centrality")
+        for field in ("original_nodal_eff", "original_local_eff",
+            "original_avg_global_eff"):
+            nx.set_node_attributes(self, {n: self.copy_of_self1.nodes[n][field]
+                for n in self}, name=field)
+        self.compute_metrics(*self.efficiency_metrics)
+
         list_to_print = []
         with open(filename, "w") as csvFile:
             fields = [
@@ -1409,48 +3867,19 @@ class GeneralGraph(nx.DiGraph):
                 "original_global_eff", "final_global_eff",
                 "original_avg_global_eff", "final_avg_global_eff"
             ]
+            attributes = dict(zip(fields[1:], fields[1:]))
+            attributes.update({
+                'original_global_eff': "original_nodal_eff",
+                'final_global_eff': "final_nodal_eff"
+            })
 
             writer = csv.DictWriter(csvFile, fieldnames=fields)
             writer.writeheader()
             for n in self.copy_of_self1:
-                list_to_print.append({
-                    'Mark':
-                    n,
-                    'Description':
-                    self.copy_of_self1.nodes[n]["Description"],
-                    'InitStatus':
-                    self.copy_of_self1.nodes[n]["InitStatus"],
-                    'IntermediateStatus':
-                    self.copy_of_self1.nodes[n]["IntermediateStatus"],
-                    'FinalStatus':
-                    self.copy_of_self1.nodes[n]["FinalStatus"],
-                    'Mark_Status':
-                    self.copy_of_self1.nodes[n]["Mark_Status"],
-                    'PerturbationResistant':
-                    self.copy_of_self1.nodes[n]["PerturbationResistant"],
-                    'Area':
-                    self.copy_of_self1.nodes[n]["Area"],
-                    'Status_Area':
-                    self.copy_of_self1.nodes[n]["Status_Area"],
-                    'closeness_centrality':
-                    self.copy_of_self1.nodes[n]["closeness_centrality"],
-                    'betweenness_centrality':
-                    self.copy_of_self1.nodes[n]["betweenness_centrality"],
-                    'indegree_centrality':
-                    self.copy_of_self1.nodes[n]["indegree_centrality"],
-                    'original_local_eff':
-                    self.copy_of_self1.nodes[n]["original_local_eff"],
-                    'final_local_eff':
-                    self.copy_of_self1.nodes[n]["final_local_eff"],
-                    'original_global_eff':
-                    self.copy_of_self1.nodes[n]["original_nodal_eff"],
-                    'final_global_eff':
-                    self.copy_of_self1.nodes[n]["final_nodal_eff"],
-                    'original_avg_global_eff':
-                    self.copy_of_self1.nodes[n]["original_avg_global_eff"],
-                    'final_avg_global_eff':
-                    self.copy_of_self1.nodes[n]["final_avg_global_eff"]
-                })
+                list_to_print.append(dict({'Mark': n}, **{
+                    field: self.copy_of_self1.nodes[n][attribute]
+                    for field, attribute in attributes.items()
+                }))
             writer.writerows(list_to_print)
         csvFile.close()
 
@@ -1,6 +1,8 @@
 """TestOutputGraph to check output of GeneralGraph"""
 
 from unittest import TestCase
+import time
+from itertools import combinations
 import numpy as np
 import networkx as nx
 from grape.general_graph import GeneralGraph
@@ -82,6 +84,69 @@ def test_global_eff_before():
         err_msg="ORIGINAL GLOBAL EFFICIENCY failure")
 
 
+def test_efficiency_materialization():
+    """
+	The following test checks the efficiency attribute, materialized on
+	demand from the distance matrix, before any perturbation.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.check_before()
+    g.materialize_efficiency()
+
+    efficiency_1 = {
+        '1': 0.0,
+        '2': 1.0,
+        '3': 1.0,
+        '4': 0.5,
+        '5': 0.5,
+        '6': 0.3333333333333333,
+        '11': 0.3333333333333333,
+        '7': 0.25,
+        '8': 0.25,
+        '19': 0.25,
+        '9': 0.2,
+        '12': 0.2,
+        '14': 0.2,
+        '16': 0.16666666666666666,
+        '13': 0.16666666666666666,
+        '18': 0.16666666666666666,
+        '17': 0.14285714285714285,
+        '10': 0.125
+    }
+
+    g_efficiency = nx.get_node_attributes(g, 'efficiency')
+
+    np.testing.assert_equal(
+        sorted(efficiency_1.keys()), sorted(g_efficiency['1'].keys()),
+        err_msg="EFFICIENCY failure: reachable targets")
+    np.testing.assert_array_almost_equal(
+        np.asarray([efficiency_1[k] for k in sorted(efficiency_1)]),
+        np.asarray([g_efficiency['1'][k] for k in sorted(efficiency_1)]),
+        err_msg="EFFICIENCY failure")
+
+
+def test_efficiency_materialization_streaming():
+    """
+	The following test checks that the efficiency attribute, materialized
+	in streaming mode, where the distance matrix is not stored, matches the
+	one materialized from the distance matrix.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.check_before()
+    g.materialize_efficiency()
+
+    h = GeneralGraph()
+    h.load("tests/TOY_graph.csv")
+    h.streaming = True
+    h.check_before()
+    h.materialize_efficiency()
+
+    assert nx.get_node_attributes(h, 'efficiency') == \
+        nx.get_node_attributes(g, 'efficiency')
+
+
 def test_local_eff_before():
     """
 	The following test checks the local efficiency before any perturbation.
@@ -198,6 +263,132 @@ def test_betweenness_centrality():
         err_msg="BETWENNESS CENTRALITY failure")
 
 
+def test_betweenness_centrality_all_shortest_paths():
+    """
+	The following test checks the betweenness centrality before any
+	perturbation, when all the shortest paths between each source-target
+	couple are taken into account.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.check_before()
+    g.betweenness_centrality(all_shortest_paths=True)
+
+    tot_shortest_paths = sum(len(nx.descendants(g, n)) for n in g)
+    betweenness_centrality = {
+        k: v / tot_shortest_paths
+        for k, v in nx.betweenness_centrality(
+            g, normalized=False, weight='weight').items()
+    }
+
+    g_betweenness_centrality=nx.get_node_attributes(g,'betweenness_centrality')
+
+    np.testing.assert_array_almost_equal(
+        np.asarray([betweenness_centrality[n] for n in g]),
+        np.asarray([g_betweenness_centrality[n] for n in g]),
+        err_msg="BETWENNESS CENTRALITY failure: all shortest paths")
+
+
+def test_betweenness_centrality_ties():
+    """
+	The following test checks how ties among shortest paths of the same
+	length are broken when a single shortest path is taken into account:
+	the path through the predecessor which comes first in the order of the
+	nodes is chosen.
+	"""
+    for order in [['S', 'A', 'B', 'T'], ['S', 'B', 'A', 'T']]:
+        g = GeneralGraph()
+        g.add_nodes_from(order)
+        g.add_edges_from([('S', 'A'), ('S', 'B'), ('A', 'T'), ('B', 'T')],
+            weight=1.)
+
+        g.betweenness_centrality()
+        betweenness_centrality = nx.get_node_attributes(g,
+            'betweenness_centrality')
+        assert betweenness_centrality == {'S': 0., order[1]: 0.2,
+            order[2]: 0., 'T': 0.}
+
+        g.betweenness_centrality(all_shortest_paths=True)
+        betweenness_centrality = nx.get_node_attributes(g,
+            'betweenness_centrality')
+        assert betweenness_centrality == {'S': 0., 'A': 0.1, 'B': 0.1,
+            'T': 0.}
+
+
+def test_approximate_betweenness_centrality():
+    """
+	The following test checks the approximate betweenness centrality,
+	estimated by sampling the sources, against the exact one.
+	"""
+    g = GeneralGraph(nx.gnp_random_graph(300, 0.01, seed=1, directed=True))
+    nx.set_edge_attributes(g, 1., 'weight')
+
+    g.betweenness_centrality()
+    betweenness_centrality = nx.get_node_attributes(g,'betweenness_centrality')
+
+    g.betweenness_centrality(approximate=True, epsilon=0.01, seed=0)
+    g_betweenness_centrality_ci = nx.get_node_attributes(g,
+        'betweenness_centrality_ci')
+
+    half_widths = [(up - low) / 2 for low, up in
+        g_betweenness_centrality_ci.values()]
+    coverage = np.mean([
+        g_betweenness_centrality_ci[n][0] <= betweenness_centrality[n] <=
+        g_betweenness_centrality_ci[n][1] for n in g
+    ])
+
+    np.testing.assert_array_less(max(half_widths), 0.01 + 1e-12,
+        err_msg="APPROXIMATE BETWENNESS CENTRALITY failure: interval width")
+    np.testing.assert_array_less(0.8, coverage,
+        err_msg="APPROXIMATE BETWENNESS CENTRALITY failure: coverage")
+
+    g.betweenness_centrality(approximate=True, epsilon=0., seed=0)
+    g_betweenness_centrality=nx.get_node_attributes(g,'betweenness_centrality')
+
+    np.testing.assert_array_almost_equal(
+        np.asarray([betweenness_centrality[n] for n in g]),
+        np.asarray([g_betweenness_centrality[n] for n in g]),
+        err_msg="APPROXIMATE BETWENNESS CENTRALITY failure: all sources")
+
+    g.betweenness_centrality()
+    np.testing.assert_equal(
+        len(nx.get_node_attributes(g, 'betweenness_centrality_ci')), 0,
+        err_msg="APPROXIMATE BETWENNESS CENTRALITY failure: stale intervals")
+
+
+def test_approximate_betweenness_centrality_top_k():
+    """
+	The following test checks that the approximate betweenness centrality,
+	stopped as soon as the top k ranking is stable, finds the same top k
+	nodes as the exact one without sampling every source.
+	"""
+    g = GeneralGraph()
+    hubs = ['H0', 'H1', 'H2', 'H3']
+    rng = np.random.RandomState(0)
+    for i in range(600):
+        g.add_edge(str(i), hubs[i % 4], weight=1.)
+        g.add_edge(hubs[(i + 1) % 4], str(i), weight=1.)
+        g.add_edge(str(i), str(rng.randint(600)), weight=1.)
+    for h in range(4):
+        g.add_edge(hubs[h], hubs[(h + 1) % 4], weight=1.)
+
+    g.betweenness_centrality()
+    betweenness_centrality = nx.get_node_attributes(g,'betweenness_centrality')
+
+    g.betweenness_centrality(approximate=True, epsilon=1e-6, seed=0, top_k=4)
+    g_betweenness_centrality=nx.get_node_attributes(g,'betweenness_centrality')
+    g_betweenness_centrality_ci = nx.get_node_attributes(g,
+        'betweenness_centrality_ci')
+
+    top_k = lambda b: set(sorted(b, key=b.get, reverse=True)[:4])
+    np.testing.assert_equal(top_k(g_betweenness_centrality),
+        top_k(betweenness_centrality),
+        err_msg="APPROXIMATE BETWENNESS CENTRALITY failure: top k")
+    np.testing.assert_array_less(0., max(up - low for low, up in
+        g_betweenness_centrality_ci.values()),
+        err_msg="APPROXIMATE BETWENNESS CENTRALITY failure: every source")
+
+
 def test_indegree_centrality():
     """
 	The following test checks the indegree centrality before any perturbation.
@@ -315,6 +506,605 @@ def test_degree_centrality():
         err_msg="DEGREE CENTRALITY failure")
 
 
+def test_degree_centralities():
+    """
+	The following test checks indegree, outdegree and degree centrality,
+	computed all together, against the ones of networkx.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.degree_centralities()
+
+    for field, nx_centrality in [
+        ("indegree_centrality", nx.in_degree_centrality),
+        ("outdegree_centrality", nx.out_degree_centrality),
+        ("degree_centrality", nx.degree_centrality)]:
+        g_centrality = nx.get_node_attributes(g, field)
+        centrality = nx_centrality(g)
+
+        np.testing.assert_array_almost_equal(
+            np.asarray([centrality[n] for n in g]),
+            np.asarray([g_centrality[n] for n in g]),
+            err_msg=field.upper() + " failure")
+
+
+def test_streaming_mode():
+    """
+	The following test checks that efficiency and closeness measures, and
+	service paths, computed in streaming mode match the ones computed
+	from all-pairs shortest paths, before and after a perturbation.
+	The perturbation here considered is the deletion of a node, namely node '1'.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.delete_a_node("1")
+
+    h = GeneralGraph()
+    h.load("tests/TOY_graph.csv")
+    h.streaming = True
+    h.delete_a_node("1")
+
+    for field in ["closeness_centrality", "original_nodal_eff",
+        "original_local_eff", "original_avg_global_eff"]:
+        g_field = nx.get_node_attributes(g, field)
+        h_field = nx.get_node_attributes(h, field)
+
+        np.testing.assert_array_almost_equal(
+            np.asarray([g_field[n] for n in g]),
+            np.asarray([h_field[n] for n in g]),
+            err_msg=field.upper() + " failure: streaming mode")
+
+    for field in ["final_nodal_eff", "final_local_eff"]:
+        g_field = nx.get_node_attributes(g.copy_of_self1, field)
+        h_field = nx.get_node_attributes(h.copy_of_self1, field)
+
+        np.testing.assert_array_almost_equal(
+            np.asarray([g_field[n] for n in g]),
+            np.asarray([h_field[n] for n in g]),
+            err_msg=field.upper() + " failure: streaming mode")
+
+    for field in ["original_shortest_path_length", "original_pair_efficiency"]:
+        np.testing.assert_equal(
+            [path[field] for path in g.lst0],
+            [path[field] for path in h.lst0],
+            err_msg=field.upper() + " failure: streaming mode")
+
+
+def test_lazy_metrics():
+    """
+	The following test checks that metrics are computed together with the
+	metrics they depend on, only once, and again after the graph changes.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.compute_metrics("global_efficiency")
+
+    assert g.computed_metrics == {"calculate_shortest_path",
+        "nodal_efficiency", "global_efficiency"}
+
+    g.remove_node("1")
+    assert g.computed_metrics == set()
+
+    g.compute_metrics("closeness_centrality")
+    closeness = nx.get_node_attributes(g, "closeness_centrality")
+
+    assert "1" not in closeness
+    assert g.computed_metrics == {"calculate_shortest_path",
+        "closeness_centrality"}
+
+
+def test_lazy_metrics_report():
+    """
+	The following test checks that the graph characterization written after
+	a perturbation for which no metric has been requested is the one written
+	when all the metrics are requested.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.delete_a_node("1", metrics=())
+    with open("element_perturbation.csv") as csvFile:
+        g_report = csvFile.read()
+
+    h = GeneralGraph()
+    h.load("tests/TOY_graph.csv")
+    h.delete_a_node("1")
+    with open("element_perturbation.csv") as csvFile:
+        h_report = csvFile.read()
+
+    assert g_report == h_report
+
+
+def test_rm_nodes_deep_chain():
+    """
+	The following test checks that the perturbation propagates along a chain
+	deeper than the recursion limit, and stops at a valve or at a node
+	fed in OR by a node which is not broken.
+	"""
+    g = GeneralGraph()
+    nx.add_path(g, [str(i) for i in range(5000)])
+    g.add_edge('-1', '4000')
+    g.D = dict.fromkeys(g, "pipe")
+    g.D['3000'] = "isolation_A"
+    g.status = dict.fromkeys(g, "1")
+    g.condition = dict.fromkeys(g.edges, "AND")
+    g.condition[('-1', '4000')] = g.condition[('3999', '4000')] = "OR"
+    g.valv = {"isolation_A": {"0": "OPEN", "1": "CLOSED"}}
+    g.newstatus = {}
+
+    g.broken = set()
+    g.rm_nodes('0')
+    assert g.broken == set(str(i) for i in range(3000))
+    assert g.newstatus == {'3000': "0"}
+
+    g.broken = set()
+    g.rm_nodes('3001')
+    assert g.broken == set(str(i) for i in range(3001, 4000))
+
+
+def test_vectorized_cascade():
+    """
+	The following test checks that the perturbation propagated with array
+	operations breaks the same nodes of the depth first search, and that
+	it breaks a node fed in OR by two broken nodes visited one after the
+	other. The perturbation here considered is the perturbation of multiple
+	areas, namely 'area 1', 'area 2', and 'area 3'.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.simulate_multi_area_perturbation(['area1', 'area2', 'area3'])
+
+    h = GeneralGraph()
+    h.load("tests/TOY_graph.csv")
+    h.vectorized_cascade = True
+    h.simulate_multi_area_perturbation(['area1', 'area2', 'area3'])
+
+    assert set(g) == set(h)
+    assert g.newstatus == h.newstatus
+
+    g = GeneralGraph()
+    g.add_edges_from([('S', 'A'), ('S', 'B'), ('A', 'X'), ('B', 'X')])
+    g.D = dict.fromkeys(g, "pipe")
+    g.status = dict.fromkeys(g, "1")
+    g.condition = dict.fromkeys(g.edges, "AND")
+    g.condition[('A', 'X')] = g.condition[('B', 'X')] = "OR"
+    g.valv = {"isolation_A": {"0": "OPEN", "1": "CLOSED"}}
+    g.newstatus = {}
+
+    g.broken = set()
+    assert g.propagate_perturbation(['S']) == {'S', 'A', 'B', 'X'}
+
+
+def test_monte_carlo_perturbation():
+    """
+	The following test checks that the Monte Carlo simulation of a
+	perturbation in which all the nodes in the areas fail gives the
+	nodes and the paths lost by the same (vectorized) perturbation.
+	The perturbation here considered is the perturbation of multiple
+	areas, namely 'area 1', 'area 2', and 'area 3'.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.vectorized_cascade = True
+    g.simulate_multi_area_perturbation(['area1', 'area2', 'area3'])
+
+    h = GeneralGraph()
+    h.load("tests/TOY_graph.csv")
+    node_probability, pair_probability = h.monte_carlo_perturbation(
+        ['area1', 'area2', 'area3'], 1., samples=100)
+
+    assert node_probability == {
+        n: float(n not in g) for n in g.copy_of_self1 }
+    assert pair_probability == {
+        (path['from'], path['to']):
+        float(path['final_shortest_path'] == "NO_PATH") for path in g.lst }
+
+    node_probability, pair_probability = h.monte_carlo_perturbation(
+        ['area2'], 0.5, samples=1000, seed=0)
+
+    assert all(node_probability[n] == 0. for n in h if h.area[n] != 'area2')
+    assert abs(node_probability['11'] - 0.5) < 0.05
+    assert pair_probability == {
+        ('1', '18'): node_probability['18'],
+        ('15', '18'): node_probability['18'] }
+
+
+def test_rm_multiple_nodes():
+    """
+	The following test checks that the perturbation propagated from several
+	nodes in a single pass breaks the same nodes of the perturbations
+	propagated one after the other, removing the broken nodes each time.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    nodes = ['5', '13', '11', '9', '17']
+
+    g.broken = set()
+    broken = g.rm_multiple_nodes(nodes)
+    assert len(g) == 19
+
+    for node in nodes:
+        g.broken = set()
+        if node in g:
+            g.rm_nodes(node)
+            g.remove_nodes_from(g.broken)
+
+    assert broken
+    assert set(g) == set(g.Mark) - broken
+
+
+def test_decremental_shortest_path():
+    """
+	The following test checks that the shortest paths updated after the
+	removal of nodes and edges match the ones computed from scratch.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.calculate_shortest_path()
+
+    g.remove_nodes_from(['5', '13'])
+    g.remove_edge('6', '8')
+    g.calculate_shortest_path()
+    dist = g.dist.copy()
+    lengths = {n: dict(g.nodes[n]["shpath_length"]) for n in g}
+
+    g.apsp_removals = None
+    g.calculate_shortest_path()
+
+    np.testing.assert_array_almost_equal(dist, g.dist)
+    for n in g:
+        assert lengths[n].keys() == g.nodes[n]["shpath_length"].keys()
+        for target, length in lengths[n].items():
+            np.testing.assert_almost_equal(length,
+                g.nodes[n]["shpath_length"][target])
+
+
+def test_add_edge_incremental():
+    """
+	The following test checks that the shortest paths and the efficiency
+	measures updated after the addition of an edge, and after the decrease
+	of the weight of an edge, match the ones computed from scratch.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.compute_metrics(*g.efficiency_metrics)
+    g.add_edge_incremental('1', '9', weight=0.5)
+    g.decrease_edge_weight('6', '8', 0.1)
+
+    h = GeneralGraph()
+    h.load("tests/TOY_graph.csv")
+    h.add_edge('1', '9', weight=0.5)
+    h['6']['8']['weight'] = 0.1
+    h.compute_metrics(*h.efficiency_metrics)
+
+    np.testing.assert_array_almost_equal(g.dist, h.dist)
+    for field in ["original_nodal_eff", "original_local_eff",
+        "original_avg_global_eff"]:
+        eff = nx.get_node_attributes(g, field)
+        for n, value in nx.get_node_attributes(h, field).items():
+            np.testing.assert_almost_equal(eff[n], value)
+
+
+def test_add_edge_incremental_perturbation():
+    """
+	The following test checks that a perturbation can be propagated, and
+	the N-1 contingency analysis run, after the addition of an edge in OR
+	entering node '9': the edge condition is recorded with the edge, and it
+	is not changed by the decrease of the weight of an edge.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.compute_metrics(*g.efficiency_metrics)
+    g.add_edge_incremental('2', '9', weight=1.0, Father_cond='OR')
+    g.decrease_edge_weight('8', '9', 0.5)
+
+    assert g.condition[('2', '9')] == g.condition[('8', '9')] == 'OR'
+    assert g.Service[('8', '9')] == 0.5
+
+    h = GeneralGraph()
+    h.load("tests/TOY_graph.csv")
+    h.add_edge('2', '9', weight=1.0, Father_cond='OR')
+    h['8']['9']['weight'] = 0.5
+    h.condition[('2', '9')] = 'OR'
+
+    assert [(r['node'], r['broken']) for r in g.contingency_sweep()] == \
+        [(r['node'], r['broken']) for r in h.contingency_sweep()]
+
+    g.delete_a_node('2')
+    h.delete_a_node('2')
+
+    assert '9' in g
+    assert set(g) == set(h)
+
+
+def test_delete_edges():
+    """
+	The following test checks the perturbation propagated from the failure
+	of edges: the failure of one of the edges in OR entering node '9' does
+	not break it, while the failure of both of them breaks the same nodes
+	(with the same final efficiencies) of the deletion of node '9'.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.delete_an_edge('8', '9')
+
+    assert set(g) == set(g.copy_of_self1)
+    assert not g.has_edge('8', '9')
+    assert '9' not in g.nodes['8']["shortest_path"]
+
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.delete_edges([('8', '9'), ('15', '9')])
+
+    h = GeneralGraph()
+    h.load("tests/TOY_graph.csv")
+    h.delete_a_node('9')
+
+    assert set(g) == set(h)
+    assert nx.get_node_attributes(g.copy_of_self1, "Mark_Status") == \
+        nx.get_node_attributes(h.copy_of_self1, "Mark_Status")
+    np.testing.assert_array_almost_equal(
+        [g.copy_of_self1.nodes[n]["final_nodal_eff"] for n in g],
+        [h.copy_of_self1.nodes[n]["final_nodal_eff"] for n in g])
+
+
+def test_structural_copy():
+    """
+	The following test checks that the copy of the intact graph, which
+	shares the shortest paths with the graph, is not modified by the
+	perturbation of the graph.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.delete_a_node("18")
+
+    h = GeneralGraph()
+    h.load("tests/TOY_graph.csv")
+    h.calculate_shortest_path()
+
+    assert set(g.copy_of_self1) == set(h)
+    assert set(g.copy_of_self1.edges) == set(h.edges)
+    for n in h:
+        assert g.copy_of_self1.nodes[n]["shpath_length"].keys() == \
+            h.nodes[n]["shpath_length"].keys()
+    assert g.nodes['14']["shortest_path"].keys() != \
+        g.copy_of_self1.nodes['14']["shortest_path"].keys()
+
+
+def test_simulate_perturbation():
+    """
+	The following test checks that perturbations simulated against the same
+	intact graph, which is described only once, give the same results of
+	perturbations simulated on freshly loaded graphs, and leave the intact
+	graph unchanged.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+
+    for node in ['1', '9', '18']:
+        perturbed = g.simulate_perturbation("delete_a_node", node)
+
+        h = GeneralGraph()
+        h.load("tests/TOY_graph.csv")
+        h.delete_a_node(node)
+
+        assert set(perturbed) == set(h)
+        for field in ["Mark_Status", "IntermediateStatus", "FinalStatus",
+            "final_nodal_eff", "final_local_eff", "closeness_centrality"]:
+            assert nx.get_node_attributes(perturbed.copy_of_self1, field) == \
+                nx.get_node_attributes(h.copy_of_self1, field)
+
+    assert len(g) == 19
+    assert g.described
+    assert "check_before" not in g.computed_metrics
+    assert "final_nodal_eff" not in g.nodes['1']
+
+
+def test_contingency_sweep():
+    """
+	The following test checks the N-1 contingency analysis against the
+	deletion of the most critical node, leaving the graph unchanged.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    sweep = g.contingency_sweep()
+
+    assert len(g) == 19
+    assert [r['node'] for r in sweep[:3]] == ['9', '16', '17']
+    drops = [r['global_efficiency_drop'] for r in sweep]
+    assert drops == sorted(drops, reverse=True)
+
+    g.delete_a_node('9')
+    final_eff = nx.get_node_attributes(g.copy_of_self1, "final_nodal_eff")
+    original_eff = nx.get_node_attributes(g.copy_of_self1, "original_nodal_eff")
+    drop = (sum(original_eff.values()) * 18 -
+        sum(final_eff[n] for n in g) * (len(g) - 1)) / (19 * 18)
+
+    assert sweep[0]['broken'] == len(g.bn)
+    assert sweep[0]['services_lost'] == 2
+    np.testing.assert_almost_equal(sweep[0]['global_efficiency_drop'], drop)
+
+
+def test_contingency_enumeration():
+    """
+	The following test checks that the N-2 contingency analysis returns the
+	most critical pairs of nodes, skipping the pairs in which a node is
+	broken by the perturbation of the other one.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    top = g.contingency_enumeration(k=2, top=3)
+
+    assert [r['node'] for r in top] == [('2', '15'), ('2', '9'), ('4', '15')]
+    assert all(r['global_efficiency_drop'] >= 0.135 for r in top)
+    assert ('9', '16') not in list(g.undominated_combinations(list(g), 2))
+    assert g.contingency_enumeration(k=2, time_budget=0) == []
+    assert len(g) == 19
+
+
+def test_contingency_enumeration_or_cycle():
+    """
+	The following test checks the N-k contingency analysis against the
+	evaluation of all the pairs of nodes in which no node is broken by the
+	perturbation of the other one, on a graph with nodes fed in OR inside
+	a cycle, both for the depth first and the vectorized propagation.
+	"""
+    g = GeneralGraph()
+    g.add_edges_from([('1', '2'), ('2', '3'), ('2', '5'), ('3', '4'),
+        ('3', '6'), ('4', '5'), ('4', '6'), ('6', '1')], weight=1.)
+    g.D = dict.fromkeys(g, "pipe")
+    g.status = dict.fromkeys(g, "1")
+    g.condition = dict.fromkeys(g.edges, "AND")
+    g.condition[('2', '5')] = g.condition[('4', '5')] = "OR"
+    g.valv = {"isolation_A": {"0": "OPEN", "1": "CLOSED"}}
+    g.newstatus = {}
+    g.Mark = {n: n for n in g}
+    g.services_SOURCE, g.services_USER = ['1'], ['5']
+
+    for vectorized_cascade in [False, True]:
+        g.vectorized_cascade = vectorized_cascade
+        init = g.contingency_initialization()
+        closures = {n: g.broken_nodes([n]) for n in g}
+        undominated = [ (u, v) for u, v in combinations(list(g), 2)
+            if u not in closures[v] and v not in closures[u] ]
+        records = g.rank_contingencies([g.contingency_record(nodes, init)
+            for nodes in undominated], list(g))[:3]
+
+        top = g.contingency_enumeration(k=2, top=3)
+        assert top == records
+
+
+def test_most_critical():
+    """
+	The following test checks that the branch-and-bound search returns the
+	same most critical nodes of the N-1 contingency analysis, and that the
+	upper bounds of the efficiency drop hold.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    sweep = g.contingency_sweep()
+
+    for k in [1, 3, 5]:
+        assert g.most_critical(k) == sweep[:k]
+
+    drops = {r['node']: r['global_efficiency_drop'] for r in sweep}
+    upper_bounds = g.contingency_bounds(g.contingency_initialization(),
+        list(g))
+    for node, upper_bound in zip(g, upper_bounds):
+        assert upper_bound >= drops[node] - 1e-12
+
+
+def test_single_points_of_failure():
+    """
+	The following test checks the single points of failure of the
+	SOURCE-USER services, found in the dominator trees of the SOURCE nodes,
+	against the immediate dominators computed by networkx.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    dominators, counts = g.single_points_of_failure()
+
+    assert dominators == {
+        ('1', '18'): ['11', '19', '14'],
+        ('15', '18'): ['9', '16', '17', '10', '11', '19', '14']
+    }
+    assert counts == {'9': 1, '16': 1, '17': 1, '10': 1, '11': 2, '19': 2,
+        '14': 2}
+
+    csr = g.csr_initialization()
+    csc = csr.tocsc()
+    for source in ['1', '15']:
+        idom = g.dominator_kernel(csr.indptr, csr.indices, csc.indptr,
+            csc.indices, g.ids_reversed[source])
+        assert {g.ids[v]: g.ids[d] for v, d in enumerate(idom) if d >= 0} == \
+            nx.immediate_dominators(g, source)
+
+
+def test_blast_radius():
+    """
+	The following test checks that the nodes broken by the failure of one
+	or more nodes, taken from the closure index, are the ones broken by the
+	perturbation propagated with array operations.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+
+    for nodes in [[n] for n in g] + [['5', '13'], ['2', '3'], ['11', '9']]:
+        g.broken = set()
+        assert g.blast_radius(nodes) == g.propagate_perturbation(nodes)
+
+    assert "closure_index" in g.computed_metrics
+    assert g.blast_radius(['4']) == {'4', '6', '7', '8'}
+    g.remove_edge('6', '8')
+    assert g.blast_radius(['4']) == {'4', '6', '7'}
+
+
+def test_service_paths():
+    """
+	The following test checks the shortest path lengths and the simple
+	paths between SOURCE and USER nodes, looked up for all the pairs at once,
+	and the bounds on the simple paths.
+	"""
+    g = GeneralGraph()
+    g.load("tests/TOY_graph.csv")
+    g.check_before(metrics=())
+
+    pairs = g.service_pairs()
+    assert [(ii, jj) for ii, jj, i, j in pairs] == [('1', '18'), ('15', '18')]
+
+    for (ii, jj, i, j), (shp, shpl, sip, eff) in zip(pairs,
+        g.service_paths(pairs)):
+        assert shpl == nx.shortest_path_length(g, i, j, weight='weight')
+        assert eff == 1 / shpl
+        assert shp[0] == i and shp[-1] == j
+        assert sorted(sip) == sorted(nx.all_simple_paths(g, i, j))
+
+    g.simple_paths_policy = "count"
+    assert [sip for shp, shpl, sip, eff in g.service_paths(pairs)] == [4, 2]
+
+    g.max_simple_paths = 3
+    assert [sip for shp, shpl, sip, eff in g.service_paths(pairs)] == [3, 2]
+
+    g.simple_paths_policy = "all"
+    g.max_simple_paths = None
+    g.simple_paths_cutoff = 8
+    assert [len(sip) for shp, shpl, sip, eff in g.service_paths(
+        pairs)] == [2, 1]
+
+    h = GeneralGraph(nx.complete_graph(8, create_using=nx.DiGraph))
+    assert len(list(nx.all_simple_paths(h, 0, 7))) > h.max_simple_paths
+    assert len(list(h.simple_paths_kernel(h, 0, 7,
+        h.max_simple_paths))) == h.max_simple_paths == 1000
+
+    h = nx.complete_graph(12, create_using=nx.DiGraph)
+    h.add_node('T')
+    start = time.time()
+    assert list(g.simple_paths_kernel(h, 0, 'T', time_budget=0.1)) == []
+    assert time.time() - start < 5
+
+
+def test_service_valves():
+    """
+	The following test checks that the valves lying on some simple path
+	between a SOURCE and a USER are found from the nodes reachable from the
+	SOURCE, and from which the USER can be reached, also when the valves
+	are on a cycle.
+	"""
+    g = GeneralGraph()
+    g.add_edges_from([('S', 'A'), ('A', 'T'), ('A', 'V'), ('V', 'A'),
+        ('S', 'W'), ('W', 'T'), ('S', 'X'), ('X', 'U'), ('U', 'X'),
+        ('U', 'T')])
+    g.D = dict.fromkeys(g, "pipe")
+    g.D['V'] = g.D['W'] = g.D['U'] = "isolation_A"
+    g.valv = {"isolation_A": {"0": "OPEN", "1": "CLOSED"}}
+
+    descendants = nx.descendants(g, 'S') | {'S'}
+    ancestors = nx.ancestors(g, 'T') | {'T'}
+    cyclic = {'A', 'V', 'X', 'U'}
+
+    assert sorted(g.service_valves('S', 'T', descendants, ancestors,
+        cyclic)) == ['U', 'W']
+
+
 def test_global_eff_after_delete_a_node():
     """
 	The following test checks the global efficiency after a perturbation.